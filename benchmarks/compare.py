@@ -0,0 +1,46 @@
+"""
+Compares two benchmark reports produced by `benchmarks.run`.
+
+    uv run python -m benchmarks.compare base.json head.json --threshold 0.10
+
+Exits with status 1 if any median regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+def _medians(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for name, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        if "median_ms" in value:
+            flat[prefix + name] = value["median_ms"]
+        else:
+            flat.update(_medians(value, f"{prefix}{name}."))
+    return flat
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two MuLi benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = _medians(json.load(f)["results"])
+    with open(args.head, "r", encoding="utf-8") as f:
+        head = _medians(json.load(f)["results"])
+
+    regressions = 0
+    for name in sorted(base.keys() & head.keys()):
+        change = (head[name] - base[name]) / base[name] if base[name] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:40s} {base[name]:10.3f} ms -> {head[name]:10.3f} ms  {change:+7.1%}{flag}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import asyncio
+import statistics
+import time
+
+def summarize(samples: list[float]) -> dict:
+    """Milliseconds summary of a list of durations in seconds."""
+    samples = sorted(samples)
+    ms = [s * 1000 for s in samples]
+    return {
+        "runs": len(ms),
+        "median_ms": statistics.median(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "min_ms": ms[0],
+    }
+
+def measure(fn, repeat: int = 50, warmup: int = 3) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+async def ameasure(fn, repeat: int = 50, warmup: int = 3) -> dict:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+class MockClient:
+    """In-process stand-in for `openai.OpenAI` that answers from a `MockLLM` script without any I/O."""
+
+    def __init__(self, mock):
+        self.mock = mock
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+        step = self.mock.next_step(kwargs)
+        if kwargs.get("stream"):
+            return iter([ChatCompletionChunk.model_validate(chunk) for chunk in self.mock.chunks(kwargs, step)])
+        return ChatCompletion.model_validate(self.mock.completion(kwargs, step))
+
+def run(coro):
+    return asyncio.run(coro)
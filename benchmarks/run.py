@@ -0,0 +1,162 @@
+"""
+End-to-end agent-loop benchmarks, driven by the in-process mock provider.
+
+    uv run python -m benchmarks.run --output bench.json
+    uv run python -m benchmarks.compare old.json bench.json
+
+Every benchmark measures framework overhead only: the mock answers instantly,
+so any time reported is spent in MuLi itself.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from benchmarks.harness import measure, ameasure, summarize, MockClient
+from llms.mock_server import MockLLM
+
+HISTORY_SIZES = [10, 100, 1000]
+
+def _history(size: int) -> list[dict]:
+    messages = [{"role": "system", "content": "You are MuLi."}]
+    for i in range(size):
+        messages.append({"role": "user", "content": f"第 {i} 个问题：请解释一下 asyncio 的事件循环以及它如何调度协程。"})
+        messages.append({
+            "role": "assistant",
+            "content": "事件循环维护就绪队列与定时器堆，每轮取出就绪回调执行。" * 4,
+            "tool_calls": None,
+            "reasoning_content": None,
+        })
+    return messages
+
+def bench_chat_with_tools(repeat: int) -> dict:
+    """Per-turn overhead of AIModel.chat_with_tools with one tool round trip."""
+    from llms.AIModel import AIModel
+
+    script = [
+        {"content": "", "tool_calls": [{"name": "noop", "arguments": {"x": 1}}]},
+        {"content": "done"},
+    ]
+    ai = AIModel(api_key="mock", base_url="http://mock", model_name="mock", provider_type="openai", system_prompt="bench", tools=[])
+    ai.client = MockClient(MockLLM(script, loop=True))
+
+    async def noop_tool(name, arguments):
+        return "ok"
+
+    async def turn():
+        ai.messages = ai.messages[:1] # Keep history constant so only per-turn overhead is measured
+        await ai.chat_with_tools("hello", tool_executor=noop_tool)
+
+    return asyncio.run(ameasure(turn, repeat=repeat))
+
+def bench_count_tokens(repeat: int) -> dict:
+    """TokenLedger.count_messages (what MuLi._count_tokens calls) versus history size, cold and warm cache."""
+    from llms.token_ledger import TokenLedger
+
+    results = {}
+    for size in HISTORY_SIZES:
+        messages = _history(size)
+        results[f"cold_{size}"] = measure(lambda: TokenLedger("gpt-4o").count_messages(messages), repeat=max(3, repeat // 10), warmup=1)
+        ledger = TokenLedger("gpt-4o")
+        results[f"warm_{size}"] = measure(lambda: ledger.count_messages(messages), repeat=repeat)
+    return results
+
+def bench_persistence(repeat: int) -> dict:
+    """DisplayLogger.log and MuLi._save_history cost versus session length."""
+    from core.utils.logger import DisplayLogger
+    from core.agents.MuLi import MuLi
+    from llms.message import Message
+
+    results = {}
+    for size in HISTORY_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            logger = DisplayLogger(log_dir=tmp)
+            for i in range(size):
+                logger.log("user", f"entry {i} " * 20, "text")
+            results[f"display_log_{size}"] = measure(lambda: logger.log("assistant", "reply " * 50, "markdown"), repeat=repeat)
+
+            history = [Message.from_dict(m) for m in _history(size)]
+            stub = SimpleNamespace(session_file=os.path.join(tmp, "dialog.json"), ai=SimpleNamespace(messages=history), console=None)
+            results[f"save_history_{size}"] = measure(lambda: MuLi._save_history(stub), repeat=repeat)
+    return results
+
+def bench_tool_dispatch(repeat: int, mcp_tool: str | None, mcp_args: str) -> dict:
+    """execute_tool latency for a py_tool and, if given, an MCP tool."""
+    from core.tools.tool_executor import execute_tool
+    from core.tools.mcp_tools.mcp_tools import mcp_client
+
+    async def run():
+        results = {"py_tool": await ameasure(lambda: execute_tool("get_current_time", "{}"), repeat=repeat)}
+        if mcp_tool:
+            async with mcp_client:
+                results["mcp_tool"] = await ameasure(lambda: execute_tool(mcp_tool, mcp_args), repeat=max(3, repeat // 5), warmup=1)
+        return results
+
+    return asyncio.run(run())
+
+def bench_cold_start(runs: int) -> dict:
+    """Wall time of importing main.py in a fresh interpreter (everything before the first prompt but MuLi())."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+BENCHMARKS = ["chat_with_tools", "count_tokens", "persistence", "tool_dispatch", "cold_start"]
+
+def main():
+    parser = argparse.ArgumentParser(description="MuLi agent-loop benchmarks")
+    parser.add_argument("--output", default="bench.json", help="where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--only", nargs="*", choices=BENCHMARKS, help="run a subset of benchmarks")
+    parser.add_argument("--mcp-tool", help="MCP tool name to include in the dispatch benchmark")
+    parser.add_argument("--mcp-args", default="{}", help="JSON arguments for --mcp-tool")
+    parser.add_argument("--cold-start-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    selected = args.only or BENCHMARKS
+    runners = {
+        "chat_with_tools": lambda: bench_chat_with_tools(args.repeat),
+        "count_tokens": lambda: bench_count_tokens(args.repeat),
+        "persistence": lambda: bench_persistence(args.repeat),
+        "tool_dispatch": lambda: bench_tool_dispatch(args.repeat, args.mcp_tool, args.mcp_args),
+        "cold_start": lambda: bench_cold_start(args.cold_start_runs),
+    }
+
+    results = {}
+    for name in selected:
+        print(f"running {name}...", file=sys.stderr)
+        try:
+            results[name] = runners[name]()
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
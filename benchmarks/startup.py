@@ -0,0 +1,58 @@
+"""
+Cold-start regression check.
+
+    uv run python -m benchmarks.startup --budget 3.0 --runs 3
+
+Starts main.py with stdin closed (so it exits right after loading), collects the
+per-phase startup report and exits with status 1 if the median total exceeds the budget.
+Every run gets a fresh history directory (a copy of `--history`, or empty), so the
+developer's own conversation is never restored and runs are comparable.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+def run_once(history: str | None = None) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        report = os.path.join(tmp, "startup.json")
+        history_dir = os.path.join(tmp, "history")
+        if history:
+            shutil.copytree(history, history_dir)
+        env = dict(os.environ, MULI_STARTUP_REPORT=report, MULI_HISTORY_DIR=history_dir)
+        subprocess.run([sys.executable, "main.py"], stdin=subprocess.DEVNULL, capture_output=True, env=env, check=True)
+        with open(report, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="MuLi cold-start budget check")
+    parser.add_argument("--budget", type=float, default=None, help="seconds; defaults to startup.budget_seconds in config.json")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="write all reports to this JSON file")
+    parser.add_argument("--history", help="history directory to start from (copied for every run); defaults to an empty one")
+    args = parser.parse_args()
+
+    budget = args.budget
+    if budget is None:
+        from config_manage.manager import ConfigManager
+        budget = ConfigManager("config.json").get("startup.budget_seconds")
+
+    reports = [run_once(args.history) for _ in range(args.runs)]
+    median = statistics.median(r["total_seconds"] for r in reports)
+    for p in reports[-1]["phases"]:
+        seconds = "  pending" if p["seconds"] is None else f"{p['seconds'] * 1000:9.1f}"
+        print(f"{'  ' * p['depth']}{p['phase']:40s} {seconds} ms")
+    print(f"median total: {median:.3f}s" + (f" (budget {budget:.3f}s)" if budget else ""))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"median_total_seconds": median, "budget_seconds": budget, "reports": reports}, f, ensure_ascii=False, indent=2)
+    if budget and median > budget:
+        print("cold start is over budget", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,38 @@
 from llms.AIModel import AIModel
+from llms.message import Message
 from config_manage.manager import ConfigManager
 from charset_normalizer import from_path
-from core.tools import tools
+from core.tools import tools, read_only_tools
 from core.tools.tool_executor import execute_tool
 from core.utils.logger import DisplayLogger
+from core.utils.session import SessionContext, current_session
+from core.utils.notifications import notifications
+from core.utils.timers import timers
+from core.utils.tracing import span, traced
+from core.utils.startup import startup
+from core.utils.blob_store import BlobStore, spill_large_text
+from core.tools.result_compactor import clean_tool_output, keep_head_tail
+from core.utils.memory_index import MemoryIndex, MEMORY_MARKER, chunk_messages, format_hits
+from core.agents.summarizer import HierarchicalSummarizer
 
-import tiktoken
 import json
 import os
 import time
 import asyncio
 
+SUMMARY_MARKER = "[SUMMARY_CONTEXT]"
+
 class MuLi:
-    def __init__(self, console):
+    def __init__(self, console, history_dir: str = "history", session_id: str = "default", replay: bool = True):
         self.console = console
-        self.logger = DisplayLogger()
-        with open("core/prompts/MuLi.txt", "r", encoding=from_path("core/prompts/MuLi.txt").best().encoding) as f:
-            spmp = f.read()
+        self.history_dir = history_dir
+        self.session = SessionContext(session_id=session_id, history_dir=history_dir)
+        self.logger = DisplayLogger(log_dir=history_dir)
+        with startup.phase("config parse"):
+            with open("core/prompts/MuLi.txt", "r", encoding=from_path("core/prompts/MuLi.txt").best().encoding) as f:
+                spmp = f.read()
 
-        self.config = ConfigManager("config.json")
+            self.config = ConfigManager("config.json")
         self.max_context_tokens = self.config.get("model_config.max_context_tokens", 8000)
         self.ai = AIModel(
             api_key=self.config.get("model_config.main_model.api_key"),
@@ -29,20 +43,98 @@ class MuLi:
             tools=tools
         )
         self.ai.logger = self.logger # Inject logger into AIModel
-        
-        try:
-            self.encoding = tiktoken.encoding_for_model(self.ai.model_name)
-        except KeyError:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.ai.session_id = session_id
+        self.session.ai = self.ai
+        self.ai.result_processor = self._process_tool_result
+        self.ai.stream = self.config.get("model_config.stream", True)
+        if self.config.get("tools_api_config.speculative.enable", True):
+            self.ai.speculative_tools = read_only_tools | set(self.config.get("tools_api_config.speculative.extra_tools", []))
+        self.blob_store = BlobStore(os.path.join(self.history_dir, "blobs"))
+        self.summarizer = HierarchicalSummarizer(
+            self.ai,
+            os.path.join(self.history_dir, "summaries.json"),
+            chunk_tokens=self.config.get("summary.chunk_tokens", max(self.max_context_tokens // 4, 500)),
+            fanout=self.config.get("summary.fanout", 4)
+        )
+        self.memory = MemoryIndex(os.path.join(self.history_dir, "memory"), dim=self.config.get("memory.dim", 1024))
 
-        self.history_dir = "history"
         os.makedirs(self.history_dir, exist_ok=True)
         self.session_file = os.path.join(self.history_dir, "dialog.json")
         
         # Try to restore latest session
-        self._restore_session()
+        with startup.phase("history restore"):
+            self._restore_session(replay=replay)
+            timers.restore(self.session)
+
+    def _tool_token_budget(self, tool_name: str) -> int:
+        """Per-tool token budget: an explicit override, else a share of the context window."""
+        budgets = self.config.get("tools_api_config.result_budget.tools", {}) or {}
+        if tool_name in budgets:
+            return int(budgets[tool_name])
+        return int(self.max_context_tokens * self.config.get("tools_api_config.result_budget.share", 0.2))
+
+    def _process_tool_result(self, tool_name: str, result: str) -> str:
+        """
+        Tool result pipeline: strip terminal noise, fit the tool's token budget (head + tail),
+        and spill large originals into the blob store so only a reference and excerpt enter the context.
+        """
+        cleaned = clean_tool_output(result)
+        visible = keep_head_tail(cleaned, self._tool_token_budget(tool_name), self.ai.token_ledger.encoding)
+        if tool_name == "read_blob" or not self.config.get("tools_api_config.blob_store.enable", True):
+            return visible
+        threshold_chars = self.config.get("tools_api_config.blob_store.threshold_chars", 8000)
+        if len(cleaned) <= threshold_chars:
+            # Too small to spill, but the token budget still applies
+            return visible
+        if visible is cleaned:
+            # Fits the token budget; a long result still goes to disk once and is shown as an excerpt
+            visible = keep_head_tail(cleaned, self.config.get("tools_api_config.blob_store.preview_chars", 1500))
+        try:
+            return spill_large_text(self.blob_store, cleaned, threshold_chars=threshold_chars, preview=visible)
+        except OSError as e:
+            self.console.print(f"[red]存储工具结果失败: {e}[/red]")
+            return visible
+
+    def _archive_to_memory(self, messages: list[Message]):
+        """Chunks the conversation about to be compacted into the long-term memory index."""
+        if not self.config.get("memory.enable", True):
+            return
+        try:
+            with span("memory.archive") as s:
+                s.set(chunks=self.memory.add(chunk_messages(messages, self.config.get("memory.chunk_chars", 800))))
+        except (ImportError, OSError) as e:
+            self.console.print(f"[red]写入长期记忆失败: {e}[/red]")
+
+    def _inject_memories(self, send: str):
+        """Replaces last turn's recalled memories with the top-k chunks relevant to this message."""
+        self.ai.messages = [m for m in self.ai.messages if not (m.role == "system" and str(m.content or "").startswith(MEMORY_MARKER))]
+        top_k = self.config.get("memory.auto_top_k", 3)
+        if not self.config.get("memory.enable", True) or top_k <= 0:
+            return
+        try:
+            with span("memory.recall"):
+                hits = self.memory.search(send, top_k=top_k, min_score=self.config.get("memory.min_score", 0.15))
+        except (ImportError, OSError):
+            return
+        if hits:
+            self.ai.messages.append(Message(
+                "system",
+                f"{MEMORY_MARKER} 以下是长期记忆中与用户当前消息相关的早先对话片段，仅供参考：\n{format_hits(hits)}"
+            ))
+
+    @staticmethod
+    def _with_notifications(send: str, notes: list[str]) -> str:
+        """Prepends events that arrived between turns (e.g. finished background jobs) to the user message."""
+        if not notes:
+            return send
+        text = "\n".join(f"[系统通知] {note}" for note in notes)
+        return f"{text}\n\n{send}" if send else text
 
-    def _restore_session(self):
+    @property
+    def encoding(self):
+        return self.ai.token_ledger.encoding
+
+    def _restore_session(self, replay: bool = True):
         """Attempts to restore the session from dialog.json and replay display log."""
         try:
             # Restore dialog history
@@ -50,140 +142,146 @@ class MuLi:
                 with open(self.session_file, "r", encoding="utf-8") as f:
                     messages = json.load(f)
                 if messages:
-                    self.ai.messages = messages
+                    # Older histories hold full `model_dump()` payloads; only the fields providers need are kept
+                    self.ai.messages = [Message.from_dict(m) for m in messages]
                     self.console.print(f"[dim]已恢复对话历史: {self.session_file}[/dim]")
             
-            # Replay display log from loaded logger entries
-            if self.logger.entries:
-                 self._replay_display_log(self.logger.entries)
+            # Replay only the tail of the display log; older entries are paged on demand via /history
+            if replay:
+                with startup.phase("history replay"):
+                    self._replay_display_log(self.config.get("history.replay_tail", 20))
 
         except Exception as e:
             self.console.print(f"[red]恢复会话失败: {e}[/red]")
 
-    def _replay_display_log(self, logs: list):
-        """Replays the display log to the console."""
+    def _replay_display_log(self, tail: int):
+        """Replays the last `tail` display log entries to the console."""
         try:
-            from rich.markdown import Markdown
-            
+            logs = self.logger.tail(tail)
+            if not logs:
+                return
             self.console.print("[dim]--- 历史会话回放开始 ---[/dim]")
-            for entry in logs:
-                role = entry.get("role")
-                content = entry.get("content")
-                type_ = entry.get("type", "text")
-                
-                if type_ == "markdown":
-                    self.console.print(Markdown(str(content)))
-                elif type_ == "tool":
-                    tool_color = "cyan" # Default
-                    self.console.print(f"[{tool_color}]{content}[/{tool_color}]")
-                else: # text
-                    if role == "user":
-                        self.console.print(f"> {content}")
-                    elif role == "system":
-                         self.console.print(f"[yellow]{content}[/yellow]")
-                    else:
-                        self.console.print(content)
+            if len(logs) == tail:
+                self.console.print("[dim]（仅回放最近的记录，更早的记录可用 /history [页码] 查看）[/dim]")
+            self.print_log_entries(logs)
             self.console.print("[dim]--- 历史会话回放结束 ---[/dim]")
             
         except Exception as e:
             self.console.print(f"[red]回放显示记录失败: {e}[/red]")
 
+    def print_log_entries(self, logs: list):
+        """Prints display log entries the way they looked live; Markdown is parsed only for what is printed."""
+        from rich.markdown import Markdown
 
-    def _count_tokens(self, messages: list[dict]) -> int:
-        """计算消息列表的 token 数量"""
-        encoding = self.encoding
-        
-        num_tokens = 0
-        for message in messages:
-            num_tokens += 4  # every message follows <im_start>{role/name}\n{content}<im_end>\n
-            for key, value in message.items():
-                if key == "reasoning_content": continue # Skip reasoning for token count if intended, or keep it? User wants to exclude it from summary, not necessarily count. But usually CoT is not in context window for *next* turn if we summarized. 
-                # Let's count it for now as it IS in context until summarized.
-                if isinstance(value, str):
-                    num_tokens += len(encoding.encode(value))
-                elif isinstance(value, list): # For tool calls etc
-                     num_tokens += len(encoding.encode(str(value)))
-        num_tokens += 2  # every reply is primed with <im_start>assistant
-        return num_tokens
+        for entry in logs:
+            role = entry.get("role")
+            content = entry.get("content")
+            type_ = entry.get("type", "text")
+            
+            if type_ == "markdown":
+                self.console.print(Markdown(str(content)))
+            elif type_ == "tool":
+                tool_color = "cyan" # Default
+                self.console.print(f"[{tool_color}]{content}[/{tool_color}]")
+            else: # text
+                if role == "user":
+                    self.console.print(f"> {content}")
+                elif role == "system":
+                     self.console.print(f"[yellow]{content}[/yellow]")
+                else:
+                    self.console.print(content)
 
+    def show_history_page(self, page: int = 1):
+        """Prints one page of the display log, read from disk; page 1 is the most recent."""
+        page_size = self.config.get("history.page_size", 20)
+        total_pages = max(1, -(-len(self.logger) // page_size))
+        entries = self.logger.page(page, page_size)
+        if not entries:
+            self.console.print(f"[yellow]没有第 {page} 页（共 {total_pages} 页）[/yellow]")
+            return
+        self.console.print(f"[dim]--- 历史记录 第 {page}/{total_pages} 页（第 1 页为最近） ---[/dim]")
+        self.print_log_entries(entries)
+        self.console.print(f"[dim]--- 第 {page}/{total_pages} 页结束{'，输入 /history ' + str(page + 1) + ' 查看更早的记录' if page < total_pages else ''} ---[/dim]")
+
+
+    def _count_tokens(self, messages: list[Message]) -> int:
+        """计算消息列表的 token 数量（按内容缓存，历史消息不会重复编码）"""
+        return self.ai.token_ledger.count_messages(messages)
+
+    @traced("agent.summarize")
     async def _summarize_conversation(self):
-        """总结对话历史并压缩"""
+        """总结对话历史并压缩（只总结上次压缩后新增的对话，旧摘要由分层摘要树合并）"""
         self.console.print("[yellow]正在压缩对话历史...[/yellow]")
-        
-        try:
-            with open("core/prompts/summary.txt", "r", encoding="utf-8") as f:
-                summary_prompt = f.read()
-        except Exception:
-            summary_prompt = "请简要总结上述对话的关键信息、用户需求以及你已完成的任务。保持关键上下文，忽略无关细节。尽量保持简明扼要。你的总结将作为system提示，在你的上下文窗口不足的时候用于提示。"
-
-        # Filter out reasoning_content and existing summaries
-        SUMMARY_MARKER = "[SUMMARY_CONTEXT]"
-        messages_to_summarize = []
+
+        # Earlier summaries live in the tree; only turns added since the last compaction are new material
+        new_messages = []
         for msg in self.ai.messages[1:]: # Skip initial system prompt
-             # Deep copy to avoid modifying original during iteration if we were strictly copying, but here we just build new dicts
-             new_msg = msg.copy()
-             if "reasoning_content" in new_msg:
-                 del new_msg["reasoning_content"]
-             
-             # Skip previous summaries to avoid infinite recursion or double summary if not handled by marker replacement yet
-             # Actually, we want to summarize everything INCLUDING previous summary if we are moving the window forward?
-             # Usually yes. But if we replace the WHOLE history with [System, Summary], then the previous summary is effectively 'consumed' into the new one.
-             # So we can just summarize the current state.
-             
-             # Remove internal marker if present in content (though it should be in system prompt)
-             if isinstance(new_msg.get("content"), str):
-                 new_msg["content"] = new_msg["content"].replace(SUMMARY_MARKER, "")
-             
-             messages_to_summarize.append(new_msg)
-
-        summary_messages = [{"role": "system", "content": "You are a helpful assistant."}] + messages_to_summarize + [{"role": "user", "content": summary_prompt}]
-        
+            content = str(msg.content or "")
+            if content.startswith(SUMMARY_MARKER):
+                self.summarizer.seed(content.replace(f"{SUMMARY_MARKER} Previous conversation summary: ", "", 1))
+                continue
+            if content.startswith(MEMORY_MARKER):
+                continue # Recalled memories are already archived
+            new_messages.append(msg)
+
         try:
-             # Use the generic generate_response method
-            summary_text = self.ai.generate_response(summary_messages)
+            chunks = await self.summarizer.add(new_messages)
+            summary_text = self.summarizer.render()
 
-            # summary_text is already a string from generate_response
+            # Keep the raw turns searchable before they are replaced by the summary
+            self._archive_to_memory(new_messages)
 
-            # Fix: Access content via attribute .content, not dict item ['content']
-            new_system_context = f"{SUMMARY_MARKER} Previous conversation summary: {summary_text}"
-            
-            # Reconstruct messages: 
-            # 1. Original System Prompt
-            # 2. New Summary (with marker)
-            # 3. (Optional) Keep last K messages? 
-            # The prompt says "replace original conversation", implying aggressive compression.
-            # But usually we keep the last user message if we are "in loop"? 
-            # "Detect if close to max_tokens... summarize... replace original conversation". 
-            # If we are at the end of a turn, "original conversation" is the whole history.
-            # So [System, NewSummary] is a valid strict state.
-            
             self.ai.messages = [
-                {"role": "system", "content": self.ai.system_prompt},
-                {"role": "system", "content": new_system_context}
+                Message("system", self.ai.system_prompt),
+                Message("system", f"{SUMMARY_MARKER} Previous conversation summary: {summary_text}")
             ]
-            
-            self.console.print(f"[green]对话压缩完成。当前 Token: {self._count_tokens(self.ai.messages)}[/green]")
+
+            self.console.print(f"[green]对话压缩完成（新增 {chunks} 段摘要）。当前 Token: {self._count_tokens(self.ai.messages)}[/green]")
             self.console.print(f"[dim]摘要内容: {summary_text}[/dim]")
             self.logger.log("system", f"对话已压缩: {summary_text}", type="text")
-            
+
         except Exception as e:
             self.console.print(f"[red]压缩对话失败: {e}[/red]")
 
 
+    @traced("persist.save_history")
     def _save_history(self):
         """保存对话历史"""
         try:
             with open(self.session_file, "w", encoding="utf-8") as f:
-                json.dump(self.ai.messages, f, ensure_ascii=False, indent=2)
+                json.dump([m.to_wire() for m in self.ai.messages], f, ensure_ascii=False, indent=2)
             # self.console.print(f"[dim]对话已保存到 {self.session_file}[/dim]")
         except Exception as e:
             self.console.print(f"[red]保存历史失败: {e}[/red]")
 
-    async def chat(self, send: str) -> dict:
+    async def chat(self, send: str, event_handler=None) -> dict:
+        # Tools invoked during this turn resolve per-session state (shell, files) via the context
+        token = current_session.set(self.session)
+        # A cancelled turn (Ctrl+C) leaves no half-finished assistant/tool messages behind
+        snapshot = list(self.ai.messages)
+        notes = notifications.drain(self.session.session_id)
+        for note in notes:
+            self.console.print(f"[yellow]{note}[/yellow]")
+            self.logger.log("system", note, type="text")
+        try:
+            with span("agent.turn"):
+                return await self._chat(self._with_notifications(send, notes), event_handler)
+        except asyncio.CancelledError:
+            self.ai.messages = snapshot
+            for note in notes: # Undelivered: hand them to the next turn
+                notifications.post(self.session.session_id, note)
+            self.logger.log("system", "本轮对话已中断", type="text")
+            raise
+        finally:
+            current_session.reset(token)
+
+    async def _chat(self, send: str, event_handler=None) -> dict:
+        self._inject_memories(send)
         response = await self.ai.chat_with_tools(
             send,
             tool_executor=execute_tool,
-            console=self.console
+            console=self.console,
+            event_handler=event_handler
         )
         
         # Post-chat processing
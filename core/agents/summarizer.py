@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import time
+from core.tools.result_compactor import keep_head_tail
+from core.utils.memory_index import message_text
+from llms.message import Message
+
+class HierarchicalSummarizer:
+    """
+    Rolling summary tree persisted to `summaries.json`.
+
+    Compacted messages are cut into chunks of about `chunk_tokens` and each
+    chunk is summarized exactly once (level 0). Whenever a level holds
+    `fanout` summaries they are merged into one summary on the level above.
+    Every request therefore sees one chunk or `fanout` summaries, never the
+    whole history, and the rendered context holds at most `fanout - 1`
+    summaries per level.
+    """
+
+    def __init__(self, ai, path: str, chunk_tokens: int = 2000, fanout: int = 4):
+        self.ai = ai
+        self.path = path
+        self.chunk_tokens = chunk_tokens
+        self.fanout = max(2, fanout)
+        self.levels: list[list[dict]] = []
+        self.chunk_prompt = self._read_prompt("core/prompts/summary.txt", "请简要总结上述对话的关键信息、用户需求以及你已完成的任务。")
+        self.merge_prompt = self._read_prompt("core/prompts/summary_merge.txt", "请将以下按时间顺序排列的多段对话摘要合并为一段摘要，保留关键信息。")
+        self._load()
+
+    @staticmethod
+    def _read_prompt(path: str, default: str) -> str:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return default
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.levels = json.load(f).get("levels", [])
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"levels": self.levels}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def seed(self, summary_text: str):
+        """Adopts a summary produced before the tree existed as the oldest top-level node."""
+        if not self.levels and summary_text:
+            self.levels = [[], [{"text": summary_text, "ts": time.time()}]]
+
+    def _chunks(self, messages: list[Message]) -> list[str]:
+        chunks, current, size = [], [], 0
+        encoding = self.ai.token_ledger.encoding
+        for msg in messages:
+            line = message_text(msg)
+            if line is None:
+                continue
+            # A single oversized message (e.g. a tool result) is cut down to fit one chunk
+            line = keep_head_tail(line, self.chunk_tokens, encoding)
+            tokens = self.ai.token_ledger.count_text(line)
+            if current and size + tokens > self.chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    async def _ask(self, material: str, prompt: str) -> str:
+        return await self.ai.agenerate_response([
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": f"{material}\n\n{prompt}"}
+        ])
+
+    async def add(self, messages: list[Message]) -> int:
+        """Summarizes only `messages` (new since the last compaction) and merges full levels; returns the chunk count."""
+        chunks = self._chunks(messages)
+        summaries = await asyncio.gather(*(self._ask(f"以下是一段对话记录：\n{chunk}", self.chunk_prompt) for chunk in chunks))
+        # Work on a copy: if a merge request fails, the tree in memory and on disk stays as it was
+        levels = [list(nodes) for nodes in self.levels] or [[]]
+        now = time.time()
+        levels[0].extend({"text": text, "ts": now} for text in summaries)
+
+        level = 0
+        while level < len(levels):
+            while len(levels[level]) >= self.fanout:
+                group, levels[level] = levels[level][:self.fanout], levels[level][self.fanout:]
+                material = "\n\n".join(f"[摘要 {i}]\n{node['text']}" for i, node in enumerate(group, 1))
+                merged = await self._ask(material, self.merge_prompt)
+                if level + 1 == len(levels):
+                    levels.append([])
+                levels[level + 1].append({"text": merged, "ts": group[-1]["ts"]})
+            level += 1
+        self.levels = levels
+        self._save()
+        return len(chunks)
+
+    def render(self) -> str:
+        """All live summaries, oldest (highest level) first."""
+        return "\n\n".join(node["text"] for nodes in reversed(self.levels) for node in nodes)
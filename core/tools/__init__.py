@@ -1,10 +1,28 @@
-from core.tools.py_tools import tools as py_tools_list
-from core.tools.mcp_tools import tools as mcp_tools_list, mcp_tool_names
-from core.tools.mcp_tools.mcp_tools import mcp_client
+from core.tools.py_tools import tools as py_tools_list, read_only_tools as py_read_only_tools
+from core.tools.mcp_tools import tools as mcp_tools_list, mcp_tool_names, mcp_read_only_tools
+from core.tools.mcp_tools.mcp_tools import mcp_client, mcp_cache
+from core.utils.tracing import traced, metrics
 
 tools = py_tools_list + mcp_tools_list
+# Side-effect-free tools, safe to start before the model has finished its message
+read_only_tools = py_read_only_tools | mcp_read_only_tools
 
+@traced("tool.mcp")
 async def execute_mcp_tools(tool_name: str, arguments) -> str:
+    policy = mcp_cache.policy(tool_name) if mcp_cache else None
+    if policy is None:
+        return await _call_mcp_tool(tool_name, arguments)
+
+    key = mcp_cache.key(tool_name, arguments, policy)
+    cached = mcp_cache.get(key, policy.get("ttl", 300))
+    metrics.inc("muli_mcp_cache_total", tool=tool_name, result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    result = await _call_mcp_tool(tool_name, arguments)
+    mcp_cache.put(key, result)
+    return result
+
+async def _call_mcp_tool(tool_name: str, arguments) -> str:
     # Use the shared mcp_client. 
     # It is expected that the client is already connected via a context manager in the main loop.
     result = await mcp_client.call_tool(tool_name, arguments)
@@ -1,5 +1,7 @@
 from core.tools.mcp_tools.mcp_tools import list_tools, mcp_client
+from core.utils.startup import startup
 import asyncio
 
-tools, mcp_tool_names = asyncio.run(list_tools())
+with startup.phase("MCP listing"):
+    tools, mcp_tool_names, mcp_read_only_tools = asyncio.run(list_tools())
 call_client = mcp_client
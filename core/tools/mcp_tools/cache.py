@@ -0,0 +1,84 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class ToolResultCache:
+    """
+    Opt-in LRU cache for idempotent MCP tools.
+
+    `policies` maps tool names (fnmatch patterns allowed) to
+    `{"ttl": seconds, "path_args": [...]}`. Keys are the tool name plus the
+    canonical JSON of its arguments; for every argument listed in
+    `path_args` the file's mtime and size are part of the key too, so an
+    edited file is never served stale. Tools without a policy are not cached.
+    """
+
+    def __init__(self, policies: dict | None = None, max_entries: int = 256, max_chars: int = 4_000_000):
+        self.policies = dict(policies or {})
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def policy(self, tool_name: str) -> dict | None:
+        if tool_name in self.policies:
+            return self.policies[tool_name]
+        return next((p for pattern, p in self.policies.items() if fnmatch.fnmatchcase(tool_name, pattern)), None)
+
+    @staticmethod
+    def _file_version(path) -> tuple | None:
+        try:
+            st = os.stat(str(path))
+        except (OSError, ValueError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def key(self, tool_name: str, arguments: dict, policy: dict) -> tuple:
+        canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        versions = []
+        for arg in policy.get("path_args", []):
+            value = arguments.get(arg)
+            for path in value if isinstance(value, list) else [value]:
+                if path is not None:
+                    versions.append(self._file_version(path))
+        return (tool_name, canonical, tuple(versions))
+
+    def get(self, key: tuple, ttl: float) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > ttl:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, result: str):
+        if len(result) > self.max_chars:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), result)
+            self._chars += len(result)
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple):
+        _, result = self._entries.pop(key)
+        self._chars -= len(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "chars": self._chars, "hits": self.hits, "misses": self.misses}
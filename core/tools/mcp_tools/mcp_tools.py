@@ -1,11 +1,24 @@
 from config_manage.manager import ConfigManager
-from fastmcp import Client
+from core.tools.mcp_tools.supervisor import MCPSupervisor
+from core.tools.mcp_tools.cache import ToolResultCache
 import copy
 
 config_f = ConfigManager()
 config = config_f.get("mcp_tools")
-# Global client instance
-mcp_client = Client(config)
+
+def supervisor_setting(server: str, key: str, default):
+    """`mcp_supervisor.servers.<server>.<key>`, falling back to `mcp_supervisor.<key>`."""
+    return config_f.get(f"mcp_supervisor.servers.{server}.{key}", config_f.get(f"mcp_supervisor.{key}", default))
+
+# Global client instance: one supervised connection per configured server
+mcp_client = MCPSupervisor(config, supervisor_setting)
+
+# Result cache for idempotent tools, shared by all sessions (opt-in)
+mcp_cache = ToolResultCache(
+    config_f.get("mcp_cache.tools", {}),
+    max_entries=config_f.get("mcp_cache.max_entries", 256),
+    max_chars=config_f.get("mcp_cache.max_chars", 4_000_000)
+) if config_f.get("mcp_cache.enable", False) else None
 
 def fastmcp_to_openai_tools(fastmcp_tools):
     """
@@ -52,13 +65,20 @@ def fastmcp_to_openai_tools(fastmcp_tools):
     return openai_tools
 
 
-async def list_tools() -> tuple[list[dict], list[str]]:
-    # Use a temporary client for listing tools at startup.
-    # This prevents the global mcp_client (used in main loop) from being associated with a closed event loop.
-    temp_client = Client(config)
-    async with temp_client:
-        fastmcp_tools = await temp_client.list_tools()
-        tools = fastmcp_to_openai_tools(fastmcp_tools)
-        tool_names = [tool.name if hasattr(tool, 'name') else tool['name'] for tool in fastmcp_tools]
-        return (tools, tool_names)
+def _read_only(tool) -> bool:
+    """MCP tools that declare `annotations.readOnlyHint` have no side effects."""
+    annotations = tool.get('annotations') if isinstance(tool, dict) else getattr(tool, 'annotations', None)
+    if annotations is None:
+        return False
+    hint = annotations.get('readOnlyHint') if isinstance(annotations, dict) else getattr(annotations, 'readOnlyHint', None)
+    return bool(hint)
+
+async def list_tools() -> tuple[list[dict], list[str], set[str]]:
+    # Listing uses temporary per-server clients, so the global mcp_client (used in main loop)
+    # is not associated with this short-lived event loop.
+    fastmcp_tools = await mcp_client.list_tools()
+    tools = fastmcp_to_openai_tools(fastmcp_tools)
+    tool_names = [tool.name if hasattr(tool, 'name') else tool['name'] for tool in fastmcp_tools]
+    read_only = {name for name, tool in zip(tool_names, fastmcp_tools) if _read_only(tool)}
+    return (tools, tool_names, read_only)
 
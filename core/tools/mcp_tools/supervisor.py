@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from fastmcp import Client
+from core.utils.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+def server_client(name: str, server_config: dict) -> Client:
+    """A fastmcp client for one server; a single-server config keeps the tool names unprefixed."""
+    return Client({"mcpServers": {name: server_config}})
+
+class ServerConnection:
+    """
+    One supervised MCP server.
+
+    A single task owns the fastmcp client: it connects with exponential
+    backoff, pings the server every `heartbeat_interval` seconds and
+    reconnects when a ping or a call fails at the transport level.
+    """
+
+    def __init__(self, name: str, server_config: dict, settings):
+        self.name = name
+        self.server_config = server_config
+        self.call_timeout = settings(name, "call_timeout", 120)
+        self.connect_timeout = settings(name, "connect_timeout", 30)
+        self.heartbeat_interval = settings(name, "heartbeat_interval", 30)
+        self.ping_timeout = settings(name, "ping_timeout", 10)
+        self.backoff_initial = settings(name, "backoff_initial", 1)
+        self.backoff_max = settings(name, "backoff_max", 60)
+        self.semaphore = asyncio.Semaphore(settings(name, "max_concurrency", 4))
+        self.client: Client | None = None
+        self.ready = asyncio.Event()
+        self._broken = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.state = "idle"
+        self.last_error: str | None = None
+        self.calls = self.errors = self.timeouts = self.reconnects = self.in_flight = 0
+        self.latencies: deque[float] = deque(maxlen=256)
+
+    def start(self):
+        self._task = asyncio.create_task(self._supervise(), name=f"mcp-supervisor-{self.name}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.state = "closed"
+
+    async def _open(self):
+        self.state = "connecting"
+        client = server_client(self.name, self.server_config)
+        await asyncio.wait_for(client.__aenter__(), self.connect_timeout)
+        self.client = client
+        self.state = "connected"
+        self.last_error = None
+        self.ready.set()
+
+    async def _close(self):
+        self.ready.clear()
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                await asyncio.wait_for(client.__aexit__(None, None, None), self.ping_timeout)
+            except Exception:
+                pass # The process is already gone or hung; dropping the client is all that is left
+
+    def _fail(self, reason: str):
+        self.last_error = reason
+        metrics.inc("muli_mcp_errors_total", server=self.name, kind="connection")
+
+    async def _supervise(self):
+        delay = self.backoff_initial
+        try:
+            while True:
+                if not self.ready.is_set():
+                    try:
+                        await self._open()
+                        delay = self.backoff_initial
+                    except Exception as e:
+                        self._fail(f"{type(e).__name__}: {e}")
+                        self.state = "backoff"
+                        await asyncio.sleep(delay * random.uniform(1, 1.5))
+                        delay = min(delay * 2, self.backoff_max)
+                        continue
+                try:
+                    await asyncio.wait_for(self._broken.wait(), self.heartbeat_interval)
+                except TimeoutError:
+                    try:
+                        await asyncio.wait_for(self.client.ping(), self.ping_timeout)
+                        continue
+                    except Exception as e:
+                        self._fail(f"heartbeat: {type(e).__name__}: {e}")
+                self._broken.clear()
+                await self._close()
+                self.reconnects += 1
+                metrics.inc("muli_mcp_reconnects_total", server=self.name)
+        finally:
+            await self._close()
+
+    async def call_tool(self, tool: str, arguments: dict):
+        if not self.ready.is_set():
+            try:
+                await asyncio.wait_for(self.ready.wait(), self.connect_timeout)
+            except TimeoutError:
+                raise ConnectionError(f"MCP 服务器 '{self.name}' 不可用（{self.state}）: {self.last_error}") from None
+
+        from fastmcp.exceptions import ToolError
+
+        async with self.semaphore:
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(self.client.call_tool(tool, arguments), self.call_timeout)
+            except TimeoutError:
+                self.timeouts += 1
+                metrics.inc("muli_mcp_errors_total", server=self.name, kind="timeout")
+                raise TimeoutError(f"MCP 工具 '{tool}' 超过 {self.call_timeout} 秒未返回") from None
+            except ToolError:
+                self.errors += 1
+                metrics.inc("muli_mcp_errors_total", server=self.name, kind="tool")
+                raise
+            except Exception as e:
+                # Anything but a tool-level error means the session is unusable; let the supervisor reconnect
+                self.errors += 1
+                self._fail(f"{type(e).__name__}: {e}")
+                self._broken.set()
+                raise
+            finally:
+                self.in_flight -= 1
+                self.calls += 1
+                elapsed = time.perf_counter() - start
+                self.latencies.append(elapsed)
+                metrics.observe("muli_mcp_call_seconds", elapsed, server=self.name)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies)
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4) if ordered else None
+        return {
+            "state": self.state, "last_error": self.last_error, "in_flight": self.in_flight,
+            "calls": self.calls, "errors": self.errors, "timeouts": self.timeouts, "reconnects": self.reconnects,
+            "latency_p50": pct(0.5), "latency_p95": pct(0.95),
+        }
+
+class MCPSupervisor:
+    """
+    Drop-in replacement for a multi-server fastmcp `Client`: `async with` it,
+    `list_tools()` and `call_tool(name, arguments)`. Each server gets its own
+    supervised connection, so one dead or hung server does not affect others.
+    Tool names follow fastmcp's convention: `<server>_<tool>` when more than
+    one server is configured.
+    """
+
+    def __init__(self, config: dict | None, settings):
+        servers = dict((config or {}).get("mcpServers") or {})
+        self.server_configs = {name: dict(cfg) for name, cfg in servers.items()}
+        self.settings = settings
+        self.prefixed = len(self.server_configs) > 1
+        self.routes: dict[str, tuple[str, str]] = {}
+        self.connections: dict[str, ServerConnection] = {}
+
+    def _exposed_name(self, server: str, tool: str) -> str:
+        return f"{server}_{tool}" if self.prefixed else tool
+
+    async def list_tools(self) -> list:
+        """Lists every server's tools concurrently with temporary clients; unreachable servers are skipped."""
+        async def list_server(name: str):
+            async with server_client(name, self.server_configs[name]) as client:
+                return await client.list_tools()
+
+        names = list(self.server_configs)
+        results = await asyncio.gather(*(list_server(name) for name in names), return_exceptions=True)
+        tools = []
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"MCP 服务器 '{name}' 连接失败，已跳过: {result}")
+                continue
+            for tool in result:
+                exposed = self._exposed_name(name, tool.name)
+                self.routes[exposed] = (name, tool.name)
+                tools.append(tool.model_copy(update={"name": exposed}))
+        return tools
+
+    async def __aenter__(self):
+        self.connections = {name: ServerConnection(name, cfg, self.settings) for name, cfg in self.server_configs.items()}
+        for connection in self.connections.values():
+            connection.start()
+        # Wait for the first connection attempt of every server; failed ones keep retrying in the background
+        await asyncio.gather(
+            *(asyncio.wait_for(c.ready.wait(), c.connect_timeout) for c in self.connections.values()),
+            return_exceptions=True
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.gather(*(c.stop() for c in self.connections.values()))
+        self.connections = {}
+
+    async def call_tool(self, name: str, arguments: dict):
+        server, tool = self.routes.get(name, (None, name))
+        if server is None:
+            if self.prefixed or not self.connections:
+                raise ValueError(f"未知的 MCP 工具 '{name}'")
+            server = next(iter(self.connections))
+        if server not in self.connections:
+            raise ConnectionError("MCP 连接尚未建立")
+        return await self.connections[server].call_tool(tool, arguments)
+
+    def stats(self) -> dict:
+        return {name: c.stats() for name, c in self.connections.items()}
@@ -1,8 +1,45 @@
 import os
 import re
 import ast
-import importlib
-import inspect
+from core.utils.startup import startup
+
+# Functions listed in a tool's optional TOOL_READ_ONLY have no side effects and may be started speculatively
+read_only_tools: set[str] = set()
+
+ANNOTATION_TYPES = {"int": "integer", "float": "number", "bool": "boolean"}
+
+def _annotation_type(annotation: ast.expr | None) -> str:
+    """Maps a parameter annotation (as written in the source) to a JSON Schema type."""
+    if annotation is None:
+        return "string"  # 默认类型
+    annot = ast.unparse(annotation)
+    if annot in ANNOTATION_TYPES:
+        return ANNOTATION_TYPES[annot]
+    if annot.startswith("list"):
+        return "array"
+    if annot.startswith("dict"):
+        return "object"
+    return "string"
+
+def _property_schema(annotation: ast.expr | None, description: str) -> dict:
+    schema = {"type": _annotation_type(annotation), "description": description}
+    # list[X] declares its element type; arrays without "items" are rejected by the API
+    if isinstance(annotation, ast.Subscript) and ast.unparse(annotation.value) == "list":
+        schema["items"] = {"type": _annotation_type(annotation.slice)}
+    return schema
+
+def _function_signatures(parsed_module: ast.Module) -> dict[str, list[tuple[str, ast.expr | None, bool]]]:
+    """Top-level function name -> [(param name, annotation, has default)], read without importing the module."""
+    signatures = {}
+    for node in parsed_module.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = node.args
+            positional = args.posonlyargs + args.args
+            first_default = len(positional) - len(args.defaults)
+            params = [(arg.arg, arg.annotation, i >= first_default) for i, arg in enumerate(positional)]
+            params += [(arg.arg, arg.annotation, default is not None) for arg, default in zip(args.kwonlyargs, args.kw_defaults)]
+            signatures[node.name] = params
+    return signatures
 
 def generate_openai_tools():
     tools = []
@@ -13,12 +50,9 @@ def generate_openai_tools():
             continue
 
         filepath = os.path.join(current_dir, filename)
-        module_name = f"core.tools.py_tools.{filename[:-3]}"
 
         try:
-            # 导入模块
-            module = importlib.import_module(module_name)
-
+            # Schemas are built from the source alone; tool modules are imported lazily on first call
             with open(filepath, "r", encoding="utf-8") as f:
                 content = f.read()
 
@@ -39,7 +73,7 @@ def generate_openai_tools():
             for node in parsed_ast.body:
                 if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
                     var_name = node.targets[0].id
-                    if var_name in ["TOOL_NAME", "TOOL_DESCRIPTION", "TOOL_FUNCTIONS", "TOOL_PARAMETERS"]:
+                    if var_name in ["TOOL_NAME", "TOOL_DESCRIPTION", "TOOL_FUNCTIONS", "TOOL_PARAMETERS", "TOOL_READ_ONLY"]:
                         tool_info[var_name] = ast.literal_eval(node.value)
 
             required_keys = {"TOOL_NAME", "TOOL_DESCRIPTION", "TOOL_FUNCTIONS", "TOOL_PARAMETERS"}
@@ -60,7 +94,9 @@ def generate_openai_tools():
                     pass
 
             tool_functions = tool_info["TOOL_FUNCTIONS"]
+            read_only_tools.update(name for name in tool_info.get("TOOL_READ_ONLY", []) if name in tool_functions)
             tool_parameters = tool_info["TOOL_PARAMETERS"]
+            signatures = _function_signatures(ast.parse(content))
 
             for i, func_name in enumerate(tool_functions):
                 parameters_list = tool_parameters[i]
@@ -69,10 +105,7 @@ def generate_openai_tools():
                 properties = {}
                 required = []
 
-                if hasattr(module, func_name):
-                    func = getattr(module, func_name)
-                    sig = inspect.signature(func)
-
+                if func_name in signatures:
                     # 创建一个参数名到描述的映射
                     param_desc_map = {}
                     for param_dict in parameters_list:
@@ -80,36 +113,15 @@ def generate_openai_tools():
                             param_desc_map[param_name] = param_desc
 
                     # 遍历函数签名中的参数
-                    for param_name, param in sig.parameters.items():
+                    for param_name, annotation, has_default in signatures[func_name]:
                         # 跳过self参数
                         if param_name == 'self':
                             continue
 
-                        # 获取参数描述
-                        param_desc = param_desc_map.get(param_name, "")
-
-                        # 确定参数类型
-                        param_type = "string"  # 默认类型
-                        if param.annotation != inspect.Parameter.empty:
-                            annot = param.annotation
-                            if annot == int:
-                                param_type = "integer"
-                            elif annot == float:
-                                param_type = "number"
-                            elif annot == bool:
-                                param_type = "boolean"
-                            elif annot == list or str(annot).startswith("list"):
-                                param_type = "array"
-                            elif annot == dict or str(annot).startswith("dict"):
-                                param_type = "object"
-
-                        properties[param_name] = {
-                            "type": param_type,
-                            "description": param_desc
-                        }
+                        properties[param_name] = _property_schema(annotation, param_desc_map.get(param_name, ""))
 
                         # 如果参数没有默认值，则标记为required
-                        if param.default == inspect.Parameter.empty:
+                        if not has_default:
                             required.append(param_name)
                 else:
                     # 如果函数不存在，回退到旧的逻辑
@@ -140,4 +152,5 @@ def generate_openai_tools():
 
     return tools
 
-tools = generate_openai_tools()
+with startup.phase("tool schema build"):
+    tools = generate_openai_tools()
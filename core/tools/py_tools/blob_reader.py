@@ -0,0 +1,36 @@
+## -!- START REGISTER TOOL -!- ##
+## -!- START TOOL DEFINITION -!- ##
+TOOL_NAME = "blob_reader"
+TOOL_DESCRIPTION = "读取被存储为 [BLOB sha256:...] 引用的完整工具结果。过长的工具输出不会直接放入对话，而是以引用加预览的形式出现，需要查看其余内容时使用此工具按字符偏移量分段读取。"
+TOOL_FUNCTIONS = ["read_blob"]
+TOOL_PARAMETERS = [
+    [
+        {"blob_id": "引用中的 blob 标识，形如 'sha256:...'"},
+        {"offset": "起始字符偏移量，默认为0"},
+        {"length": "读取的字符数，默认为4000，最大为8000"}
+    ]
+]
+TOOL_READ_ONLY = ["read_blob"]
+## -!- END TOOL DEFINITION -!- ##
+
+import os
+from core.utils.blob_store import BlobStore
+from core.utils.session import get_session
+
+MAX_READ_CHARS = 8000
+
+def read_blob(blob_id: str, offset: int = 0, length: int = 4000) -> str:
+    store = BlobStore(os.path.join(get_session().history_dir, "blobs"))
+    try:
+        text = store.get(blob_id)
+    except ValueError as e:
+        return f"错误：{e}"
+    except FileNotFoundError:
+        return f"错误：blob '{blob_id}' 不存在"
+
+    offset = max(0, int(offset))
+    length = max(1, min(int(length), MAX_READ_CHARS))
+    chunk = text[offset:offset + length]
+    end = offset + len(chunk)
+    return f"[{blob_id} 字符 {offset}-{end} / 共 {len(text)}{'，已读完' if end >= len(text) else f'，继续读取请使用 offset={end}'}]\n{chunk}"
+## -!- END REGISTER TOOL -!- ##
@@ -6,8 +6,6 @@ import tarfile
 import io
 from pathlib import Path
 from typing import List, Dict, Any
-from tqdm import tqdm
-import docker
 
 ## -!- START TOOL DEFINITION -!- ##
 TOOL_NAME = "file_copy_container"
@@ -28,6 +26,7 @@ TOOL_PARAMETERS = [
 
 def _get_container(container_name: str):
     """获取Docker容器客户端"""
+    import docker # Imported on first use to keep startup fast
     client = docker.from_env()
     try:
         container = client.containers.get(container_name)
@@ -110,6 +109,7 @@ def copy_files_from_host_to_container(
     fail_count = 0
 
     # 总体进度条
+    from tqdm import tqdm
     with tqdm(total=len(host_file_paths), desc="总体进度") as pbar_total:
         for idx, (host_path, container_path) in enumerate(zip(host_file_paths, container_dest_paths)):
             host_path = Path(host_path)
@@ -227,6 +227,7 @@ def copy_files_from_container_to_host(
     fail_count = 0
 
     # 总体进度条
+    from tqdm import tqdm
     with tqdm(total=len(container_file_paths), desc="总体进度") as pbar_total:
         for container_path, host_path in zip(container_file_paths, host_dest_paths):
             host_path = Path(host_path)
@@ -0,0 +1,32 @@
+## -!- START REGISTER TOOL -!- ##
+## -!- START TOOL DEFINITION -!- ##
+TOOL_NAME = "memory_recall"
+TOOL_DESCRIPTION = "检索长期记忆。对话过长被压缩时，早先的原始对话会被分块存入本地长期记忆，摘要中丢失的细节（文件路径、报错信息、做过的决定等）可以用此工具按关键词或描述检索找回。"
+TOOL_FUNCTIONS = ["recall"]
+TOOL_PARAMETERS = [
+    [
+        {"query": "要检索的内容描述或关键词"},
+        {"top_k": "返回的最多条数，默认为5，最大为20"}
+    ]
+]
+TOOL_READ_ONLY = ["recall"]
+## -!- END TOOL DEFINITION -!- ##
+
+import os
+from core.utils.memory_index import MemoryIndex, format_hits
+from core.utils.session import get_session
+
+MAX_TOP_K = 20
+
+def recall(query: str, top_k: int = 5) -> str:
+    index = MemoryIndex(os.path.join(get_session().history_dir, "memory"))
+    if not len(index):
+        return "长期记忆为空：对话尚未被压缩过。"
+    try:
+        hits = index.search(query, top_k=max(1, min(int(top_k), MAX_TOP_K)))
+    except ImportError:
+        return "错误：长期记忆需要 numpy"
+    if not hits:
+        return f"未找到与 '{query}' 相关的记忆。"
+    return format_hits(hits)
+## -!- END REGISTER TOOL -!- ##
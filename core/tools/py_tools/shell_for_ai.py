@@ -1,8 +1,8 @@
 ## -!- START REGISTER TOOL -!- ##
 ## -!- START TOOL DEFINITION -!- ##
 TOOL_NAME = "shell_for_ai"
-TOOL_DESCRIPTION = "【操作对象：Docker容器内部，不能操作宿主机】在Docker容器内执行shell命令的工具。此工具的所有操作都严格限制在容器内部，包括：文件系统操作（如ls/cat/mkdir都是查看容器内的文件）、进程管理（ps/kill操作的是容器内的进程）、网络配置、软件安装（apt/pip安装的软件在容器内）等。容器环境与宿主机完全隔离，保证安全性。文件路径如/etc、/home、/tmp都是指容器内部路径，不是宿主机路径。此工具不能访问或操作用户的宿主机文件系统。你可以使用任何命令，就像正常用户，包括包管理器。运行耗时较长的命令时，请设置一个较长的睡眠时间，不要放到后台运行，不要着急，运行结束了再继续。"
-TOOL_FUNCTIONS = ["send_shell_input", "get_shell_output", "restart_shell_session", "expose_container_port", "list_exposed_ports", "close_exposed_port"]
+TOOL_DESCRIPTION = "【操作对象：Docker容器内部，不能操作宿主机】在Docker容器内执行shell命令的工具。此工具的所有操作都严格限制在容器内部，包括：文件系统操作（如ls/cat/mkdir都是查看容器内的文件）、进程管理（ps/kill操作的是容器内的进程）、网络配置、软件安装（apt/pip安装的软件在容器内）等。容器环境与宿主机完全隔离，保证安全性。文件路径如/etc、/home、/tmp都是指容器内部路径，不是宿主机路径。此工具不能访问或操作用户的宿主机文件系统。你可以使用任何命令，就像正常用户，包括包管理器。运行耗时较长的命令（编译、安装依赖、下载、跑测试等）时，请使用 submit_shell_job 作为后台任务提交，不要反复调用 get_shell_output 轮询：任务结束时你会自动收到一条带退出码和末尾输出的系统通知，收到通知前可以先做别的事或直接结束本轮回复；需要时用 get_job_status/get_job_output 查看进度。后台任务不共享交互式 shell 的当前目录和环境变量，需要时请在命令中自行 cd 或 export。交互式 shell 的全部输出都按字节位置保存在输出缓存文件中：get_shell_output 只返回新输出的末尾一段并给出其位置，输出很长时请用 grep_shell_output 搜索关键字（如 error、warning），再用 read_shell_output 按位置读取需要的部分，不要试图一次读取全部输出。"
+TOOL_FUNCTIONS = ["send_shell_input", "get_shell_output", "restart_shell_session", "expose_container_port", "list_exposed_ports", "close_exposed_port", "submit_shell_job", "get_job_status", "get_job_output", "list_shell_jobs", "cancel_shell_job", "read_shell_output", "grep_shell_output"]
 TOOL_PARAMETERS = [
     [
         {"input_text": "【发送到容器内shell】在容器内部执行的文本命令（此命令在容器内运行，不影响宿主机）。例如：'ls -la /etc'查看容器内/etc目录，'ps aux'查看容器内进程。"},
@@ -19,11 +19,35 @@ TOOL_PARAMETERS = [
     [],
     [
         {"host_port": "【关闭宿主机端口转发】要关闭端口转发的宿主机端口号。关闭后，宿主机将无法再通过此端口访问容器内的服务。"}
+    ],
+    [
+        {"command": "【容器内后台任务】在容器内以 bash -lc 运行的完整命令，例如 'cd /app && make -j8'。输出（stdout与stderr）写入该任务的日志文件。"}
+    ],
+    [
+        {"job_id": "后台任务ID，例如 'job-1'"}
+    ],
+    [
+        {"job_id": "后台任务ID，例如 'job-1'"},
+        {"tail_lines": "返回日志末尾的行数，默认为50"}
+    ],
+    [],
+    [
+        {"job_id": "要终止的后台任务ID"}
+    ],
+    [
+        {"offset": "【读取容器内shell输出缓存】起始字节位置，来自 get_shell_output 或 grep_shell_output 返回的位置"},
+        {"length": "读取的字节数，默认为4000，最大为20000"}
+    ],
+    [
+        {"pattern": "【搜索容器内shell输出缓存】要搜索的正则表达式（按行匹配），例如 'error|Error|FAILED'"},
+        {"max_matches": "最多返回的匹配行数，默认为50"}
     ]
 ]
 ## -!- END TOOL DEFINITION -!- ##
 
 import os
+import mmap
+import re
 import pty
 import select
 import subprocess
@@ -32,16 +56,37 @@ import fcntl
 import socket
 import threading
 import sys
+import json
+import shlex
+from collections import deque
 from config_manage.manager import ConfigManager
-
-# Global session state
-SHELL_SESSION = {
-    "master_fd": None,
-    "process": None,
-    "buffer": b"",
-    "container_name": "ai_shell_container", # Default name
-    "port_forwards": {} # host_port -> subprocess (Popen object)
-}
+from core.utils.notifications import notifications
+from core.utils.session import get_session
+from core.utils.tool_runtime import sleep_unless_cancelled
+
+def _new_shell_state() -> dict:
+    return {
+        "master_fd": None,
+        "process": None,
+        "spool": None, # Append-only file holding every byte the shell printed
+        "spool_base": 0, # Offset of the spool file's first byte; grows when the file is rotated
+        "read_offset": 0, # Everything before this offset was already returned by get_shell_output
+        "container_name": "ai_shell_container", # Default name
+        "port_forwards": {} # host_port -> subprocess (Popen object)
+    }
+
+# Shell state of the default (REPL) session
+SHELL_SESSION = _new_shell_state()
+# session_id -> shell state, so concurrent agent sessions never share a PTY
+_SHELL_SESSIONS = {"default": SHELL_SESSION}
+
+def _state() -> dict:
+    """Returns the shell state of the session whose turn is currently running."""
+    session_id = get_session().session_id
+    state = _SHELL_SESSIONS.get(session_id)
+    if state is None:
+        state = _SHELL_SESSIONS[session_id] = _new_shell_state()
+    return state
 
 config = ConfigManager("config.json")
 
@@ -53,8 +98,44 @@ def _get_config_value(key, default=None):
     except Exception:
         return default
 
+def _spool_end(session) -> int:
+    if session["spool"] is None:
+        return session["spool_base"]
+    return session["spool_base"] + session["spool"].tell()
+
+def _spool_write(session, chunk: bytes):
+    if session["spool"] is None:
+        session["spool"] = open(get_session().path("shell", "spool.log"), "w+b")
+    session["spool"].write(chunk)
+    session["spool"].flush()
+    max_bytes = _get_config_value("spool_max_bytes", 64 * 1024 * 1024)
+    size = session["spool"].tell()
+    if size > max_bytes:
+        # Rotate by dropping the oldest bytes. The unread tail (at least the last `output_window`
+        # bytes, at most half the limit) is kept so get_shell_output still sees the newest output
+        unread = _spool_end(session) - session["read_offset"]
+        keep = min(size, max(_get_config_value("output_window", 8000), min(unread, max_bytes // 2)))
+        session["spool"].seek(size - keep)
+        tail = session["spool"].read(keep)
+        session["spool"].seek(0)
+        session["spool"].write(tail)
+        session["spool"].truncate()
+        session["spool"].flush()
+        # Offsets keep increasing across rotations; bytes before the new base are gone
+        session["spool_base"] += size - keep
+
+def _spool_read(session, offset: int, length: int) -> bytes:
+    """Reads `length` bytes at absolute `offset` through a read-only memory map of the spool."""
+    start = offset - session["spool_base"]
+    size = _spool_end(session) - session["spool_base"]
+    if session["spool"] is None or start >= size or length <= 0:
+        return b""
+    with mmap.mmap(session["spool"].fileno(), size, access=mmap.ACCESS_READ) as view:
+        return view[max(0, start):min(size, start + length)]
+
 def _ensure_session():
     """Ensures that the shell session is running. Starts it if necessary."""
+    session = _state()
     
     # Check if enabled
     enabled = _get_config_value("enable", False)
@@ -62,20 +143,20 @@ def _ensure_session():
         return "Error: shell_for_ai is not enabled in config.json. Please set 'enable': true."
 
     container_name = _get_config_value("container_name", "ai_shell_container")
-    SHELL_SESSION["container_name"] = container_name
+    session["container_name"] = container_name
 
     # Check if process is alive
-    if SHELL_SESSION["process"] is not None:
-        if SHELL_SESSION["process"].poll() is None:
+    if session["process"] is not None:
+        if session["process"].poll() is None:
             return None # Alive
         else:
             # Died, cleanup
             try:
-                os.close(SHELL_SESSION["master_fd"])
+                os.close(session["master_fd"])
             except:
                 pass
-            SHELL_SESSION["master_fd"] = None
-            SHELL_SESSION["process"] = None
+            session["master_fd"] = None
+            session["process"] = None
     
     # Start new session
     # Verify container exists/running first? 
@@ -106,8 +187,8 @@ def _ensure_session():
         )
         os.close(slave) # Close child's handle in parent
         
-        SHELL_SESSION["process"] = p
-        SHELL_SESSION["master_fd"] = master
+        session["process"] = p
+        session["master_fd"] = master
         
         # Set non-blocking
         fl = fcntl.fcntl(master, fcntl.F_GETFL)
@@ -123,18 +204,19 @@ def _ensure_session():
 
 def _read_available_output():
     """Reads all currently available output from the master_fd."""
-    if SHELL_SESSION["master_fd"] is None:
+    session = _state()
+    if session["master_fd"] is None:
         return
     
     try:
         while True:
-            r, _, _ = select.select([SHELL_SESSION["master_fd"]], [], [], 0.01)
+            r, _, _ = select.select([session["master_fd"]], [], [], 0.01)
             if not r:
                 break
-            chunk = os.read(SHELL_SESSION["master_fd"], 10240)
+            chunk = os.read(session["master_fd"], 10240)
             if not chunk:
                 break
-            SHELL_SESSION["buffer"] += chunk
+            _spool_write(session, chunk)
     except OSError:
         pass
 
@@ -143,6 +225,7 @@ def send_shell_input(input_text: str = None, key_combo: str = None) -> str:
     Sends text or a key combination to the shell session.
     Example: send_shell_input("python3") then send_shell_input(key_combo="Enter")
     """
+    session = _state()
     if input_text is not None and key_combo is None:
         key_combo = "Enter"  # Default to Enter if only text is provided
         
@@ -150,7 +233,7 @@ def send_shell_input(input_text: str = None, key_combo: str = None) -> str:
     if err:
         return err
 
-    fd = SHELL_SESSION["master_fd"]
+    fd = session["master_fd"]
     
     msg = []
 
@@ -193,8 +276,10 @@ def send_shell_input(input_text: str = None, key_combo: str = None) -> str:
 
 def get_shell_output(timeout_seconds: int = 1) -> str:
     """
-    Retrieves the output from the shell session.
+    Retrieves the output produced since the last call. Long output is cut to its
+    last `output_window` bytes; the full text stays in the spool for read/grep.
     """
+    session = _state()
     try:
         timeout_seconds = float(timeout_seconds)
     except (ValueError, TypeError):
@@ -204,44 +289,130 @@ def get_shell_output(timeout_seconds: int = 1) -> str:
     if err:
         return err
         
-    # Wait a bit if requested
+    # Wait a bit if requested (returns early when the call is cancelled)
     if timeout_seconds > 0:
-        time.sleep(timeout_seconds)
+        sleep_unless_cancelled(timeout_seconds)
         
     _read_available_output()
     
-    # Return buffer and clear it?
-    # Usually better to clear it so we don't repeat history.
-    output = SHELL_SESSION["buffer"]
-    SHELL_SESSION["buffer"] = b""
+    start = max(session["read_offset"], session["spool_base"])
+    end = _spool_end(session)
+    session["read_offset"] = end
+    window = _get_config_value("output_window", 8000)
+    shown = max(start, end - window)
+    output = _spool_read(session, shown, end - shown)
     
     # Decode 
     try:
         decoded = output.decode('utf-8', errors='replace')
-        # Filter out some terminal control sequences if necessary, but raw is okay for now.
-        return decoded
     except Exception as e:
         return f"<Decoding Error: {str(e)}>"
+    if shown > start:
+        return (
+            f"[Output bytes {start}-{end}: showing only the last {end - shown} bytes ({shown}-{end}). "
+            f"Use grep_shell_output / read_shell_output to inspect the rest.]\n{decoded}"
+        )
+    return f"{decoded}\n[Output bytes {start}-{end}]" if decoded else f"[No new output; spool at byte {end}]"
+
+def read_shell_output(offset: int, length: int = 4000) -> str:
+    """Reads an arbitrary byte range of this session's shell output spool."""
+    session = _state()
+    try:
+        offset, length = int(offset), min(int(length), 20000)
+    except (ValueError, TypeError):
+        return "Error: offset and length must be integers."
+    _read_available_output()
+    end = _spool_end(session)
+    if offset < session["spool_base"]:
+        return f"Error: Bytes before {session['spool_base']} were rotated out of the spool."
+    if offset >= end:
+        return f"Error: Offset {offset} is past the end of the output ({end} bytes)."
+    data = _spool_read(session, offset, length)
+    return f"[Output bytes {offset}-{offset + len(data)} of {end}]\n" + data.decode("utf-8", errors="replace")
+
+def grep_shell_output(pattern: str, max_matches: int = 50) -> str:
+    """Searches the shell output spool line by line; returns matching lines with their byte offsets."""
+    session = _state()
+    try:
+        regex = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+        max_matches = int(max_matches)
+    except (re.error, ValueError, TypeError) as e:
+        return f"Error: Invalid pattern or max_matches: {str(e)}"
+    _read_available_output()
+    size = _spool_end(session) - session["spool_base"]
+    if session["spool"] is None or size == 0:
+        return "No shell output yet."
+
+    lines, total = [], 0
+    with mmap.mmap(session["spool"].fileno(), size, access=mmap.ACCESS_READ) as view:
+        position = 0
+        for match in regex.finditer(view):
+            if match.start() < position:
+                continue # Another match on a line already reported
+            line_start = view.rfind(b"\n", 0, match.start()) + 1
+            line_end = view.find(b"\n", match.end())
+            line_end = size if line_end == -1 else line_end
+            position = line_end + 1
+            total += 1
+            if len(lines) < max_matches:
+                line = view[line_start:min(line_end, line_start + 500)].decode("utf-8", errors="replace").rstrip("\r")
+                lines.append(f"{session['spool_base'] + line_start}: {line}")
+    if not lines:
+        return f"No lines match '{pattern}'."
+    more = f"\n[{total - len(lines)} more matching lines not shown]" if total > len(lines) else ""
+    return "\n".join(lines) + more
 
 def restart_shell_session() -> str:
     """Forces a restart of the Docker shell session."""
-    if SHELL_SESSION["process"]:
+    session = _state()
+    if session["process"]:
         try:
-            SHELL_SESSION["process"].terminate()
-            SHELL_SESSION["process"].wait()
+            session["process"].terminate()
+            session["process"].wait()
         except:
             pass
         try:
-            os.close(SHELL_SESSION["master_fd"])
+            os.close(session["master_fd"])
         except:
             pass
             
-    SHELL_SESSION["process"] = None
-    SHELL_SESSION["master_fd"] = None
-    SHELL_SESSION["buffer"] = b""
+    session["process"] = None
+    session["master_fd"] = None
+    session["read_offset"] = _spool_end(session)
     
     return "Session terminated. It will restart on next input."
 
+def _close_session(session_id: str):
+    """Releases a closed session's shell: the PTY process, its port forwarders and the spool file."""
+    with _JOBS_LOCK:
+        # Running jobs keep their entry until they finish and notify
+        if (jobs := _JOBS.get(session_id)) is not None:
+            _prune_jobs(jobs, 0)
+            if not jobs:
+                del _JOBS[session_id]
+    session = _SHELL_SESSIONS.pop(session_id, None)
+    if session is None:
+        return
+    processes = [session["process"]] + [info["process"] for info in session["port_forwards"].values()]
+    for proc in processes:
+        if proc is None:
+            continue
+        try:
+            proc.terminate()
+            try:
+                proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        except Exception:
+            pass
+    try:
+        if session["master_fd"] is not None:
+            os.close(session["master_fd"])
+        if session["spool"] is not None:
+            session["spool"].close()
+    except OSError:
+        pass
+
 def _get_container_ip(container_name: str) -> str:
     """Gets the IP address of the container."""
     try:
@@ -260,6 +431,7 @@ def expose_container_port(container_port: int, host_port: int = 0) -> str:
     """
     Exposes a port from the container to the host using a python-based proxy.
     """
+    session = _state()
     try:
         container_port = int(container_port)
         host_port = int(host_port) if host_port else 0
@@ -270,7 +442,7 @@ def expose_container_port(container_port: int, host_port: int = 0) -> str:
     if err:
         return err
 
-    container_name = SHELL_SESSION["container_name"]
+    container_name = session["container_name"]
     container_ip = _get_container_ip(container_name)
     
     if not container_ip:
@@ -279,7 +451,7 @@ def expose_container_port(container_port: int, host_port: int = 0) -> str:
     if host_port == 0:
         host_port = _find_free_port()
     
-    if host_port in SHELL_SESSION["port_forwards"]:
+    if host_port in session["port_forwards"]:
         return f"Error: Host port {host_port} is already being forwarded."
 
     # Python one-liner for TCP proxy
@@ -342,7 +514,7 @@ main()
         except Exception:
             pass
 
-        SHELL_SESSION["port_forwards"][host_port] = {
+        session["port_forwards"][host_port] = {
             "process": proc,
             "container_port": container_port,
             "container_ip": container_ip
@@ -355,13 +527,14 @@ main()
 
 def list_exposed_ports() -> str:
     """Lists all currently active port forwards."""
-    if not SHELL_SESSION["port_forwards"]:
+    session = _state()
+    if not session["port_forwards"]:
         return "No ports currently exposed."
     
     lines = ["Active Port Forwards:"]
     to_remove = []
     
-    for hp, info in SHELL_SESSION["port_forwards"].items():
+    for hp, info in session["port_forwards"].items():
         proc = info["process"]
         if proc.poll() is not None:
             to_remove.append(hp)
@@ -373,21 +546,22 @@ def list_exposed_ports() -> str:
     
     # Cleanup dead processes
     for hp in to_remove:
-        del SHELL_SESSION["port_forwards"][hp]
+        del session["port_forwards"][hp]
         
     return "\n".join(lines)
 
 def close_exposed_port(host_port: int) -> str:
     """Stops the port forwarding for the specified host port."""
+    session = _state()
     try:
         host_port = int(host_port)
     except ValueError:
         return "Error: Host port must be an integer."
 
-    if host_port not in SHELL_SESSION["port_forwards"]:
+    if host_port not in session["port_forwards"]:
         return f"Error: No active forwarding found on host port {host_port}."
     
-    info = SHELL_SESSION["port_forwards"][host_port]
+    info = session["port_forwards"][host_port]
     proc = info["process"]
     
     try:
@@ -399,8 +573,186 @@ def close_exposed_port(host_port: int) -> str:
     except Exception:
         pass
         
-    del SHELL_SESSION["port_forwards"][host_port]
+    del session["port_forwards"][host_port]
     return f"Port forwarding on host port {host_port} stopped."
 
+# session_id -> {job_id: job}; jobs outlive the turn that submitted them
+_JOBS: dict[str, dict[str, dict]] = {}
+_JOB_SEQ: dict[str, int] = {} # session_id -> last job number, so ids stay unique after pruning
+_JOBS_LOCK = threading.Lock()
+_PID_PREFIX = b"__MULI_JOB_PID__="
+
+def _jobs() -> dict[str, dict]:
+    with _JOBS_LOCK:
+        return _JOBS.setdefault(get_session().session_id, {})
+
+def _prune_jobs(jobs: dict[str, dict], keep: int):
+    """Forgets the oldest finished jobs beyond `keep` (caller holds the lock); their logs stay on disk."""
+    finished = [job_id for job_id, job in jobs.items() if job["exit_code"] is not None]
+    for job_id in finished[:max(0, len(finished) - keep)]:
+        del jobs[job_id]
+
+def _tail(path: str, lines: int) -> str:
+    try:
+        with open(path, "rb") as f:
+            tail = deque(f, maxlen=max(1, lines))
+    except OSError:
+        return ""
+    return b"".join(tail).decode("utf-8", errors="replace")
+
+def _job_summary(job: dict) -> str:
+    end = job["finished_at"] or time.time()
+    if job["exit_code"] is None:
+        state = "running"
+    elif job["cancelled"]:
+        state = f"cancelled (exit code {job['exit_code']})"
+    else:
+        state = f"exited with code {job['exit_code']}"
+    return f"{job['id']}: {state}, {end - job['started_at']:.0f}s, command: {job['command']}"
+
+def _save_job_meta(job: dict):
+    meta = {k: job[k] for k in ("id", "command", "container_name", "started_at", "finished_at", "exit_code", "cancelled", "log_path")}
+    try:
+        with open(job["log_path"][:-len(".log")] + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+def _watch_job(job: dict, session_id: str, notify_tail_lines: int):
+    """Streams the job's output into its log, then records the exit status and notifies the session."""
+    proc = job["process"]
+    with open(job["log_path"], "wb") as log:
+        for line in proc.stdout:
+            if job["pid"] is None and line.startswith(_PID_PREFIX):
+                job["pid"] = line[len(_PID_PREFIX):].strip().decode("ascii", errors="ignore")
+                continue
+            log.write(line)
+            log.flush()
+    job["exit_code"] = proc.wait()
+    job["finished_at"] = time.time()
+    _save_job_meta(job)
+    tail = _tail(job["log_path"], notify_tail_lines).rstrip()
+    notifications.post(
+        session_id,
+        f"后台任务已结束 — {_job_summary(job)}\n日志: {job['log_path']}\n末尾输出:\n{tail or '(无输出)'}"
+    )
+
+def submit_shell_job(command: str) -> str:
+    """
+    Runs a command in the container as a background job with its own log file.
+    The agent is notified when it exits, so it does not have to poll.
+    """
+    if not _get_config_value("enable", False):
+        return "Error: shell_for_ai is not enabled in config.json. Please set 'enable': true."
+    if not command or not command.strip():
+        return "Error: Empty command."
+
+    container_name = _get_config_value("container_name", "ai_shell_container")
+    session = get_session()
+    jobs = _jobs()
+    max_jobs = _get_config_value("max_running_jobs", 4)
+    with _JOBS_LOCK:
+        running = sum(1 for job in jobs.values() if job["exit_code"] is None)
+        if running >= max_jobs:
+            return f"Error: {running} jobs are already running (limit {max_jobs}). Wait for one to finish or cancel it."
+        _prune_jobs(jobs, _get_config_value("max_finished_jobs", 20))
+        _JOB_SEQ[session.session_id] = _JOB_SEQ.get(session.session_id, 0) + 1
+        job_id = f"job-{_JOB_SEQ[session.session_id]}"
+        job = jobs[job_id] = {
+            "id": job_id,
+            "command": command,
+            "container_name": container_name,
+            "process": None,
+            "pid": None,
+            "log_path": session.path("jobs", f"{job_id}.log"),
+            "started_at": time.time(),
+            "finished_at": None,
+            "exit_code": None,
+            "cancelled": False
+        }
+
+    # Report the in-container PID first so cancel_shell_job can kill the job inside the container,
+    # then exec the command so that PID is the job itself
+    wrapper = f"echo {_PID_PREFIX.decode()}$$; exec bash -lc {shlex.quote(command)}"
+    try:
+        job["process"] = subprocess.Popen(
+            ["docker", "exec", container_name, "bash", "-c", wrapper],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError as e:
+        with _JOBS_LOCK:
+            del jobs[job_id]
+        return f"Error starting job: {str(e)}"
+
+    threading.Thread(
+        target=_watch_job,
+        args=(job, session.session_id, _get_config_value("notify_tail_lines", 20)),
+        name=f"shell-{job_id}",
+        daemon=True
+    ).start()
+    return f"Started {job_id}, log: {job['log_path']}. You will be notified with its exit code and last output when it finishes; no need to poll."
+
+def _find_job(job_id: str) -> dict | None:
+    return _jobs().get(str(job_id).strip())
+
+def get_job_status(job_id: str) -> str:
+    """Reports whether a background job is running, its exit code and its last few lines of output."""
+    job = _find_job(job_id)
+    if job is None:
+        return f"Error: No job named '{job_id}'."
+    return f"{_job_summary(job)}\nLast output:\n{_tail(job['log_path'], 10).rstrip() or '(no output yet)'}"
+
+def get_job_output(job_id: str, tail_lines: int = 50) -> str:
+    """Returns the last lines of a background job's log."""
+    job = _find_job(job_id)
+    if job is None:
+        return f"Error: No job named '{job_id}'."
+    try:
+        tail_lines = int(tail_lines)
+    except (ValueError, TypeError):
+        tail_lines = 50
+    return _tail(job["log_path"], tail_lines) or "(no output yet)"
+
+def list_shell_jobs() -> str:
+    """Lists the background jobs of this session."""
+    jobs = _jobs()
+    if not jobs:
+        return "No background jobs."
+    return "\n".join(_job_summary(job) for job in list(jobs.values()))
+
+def cancel_shell_job(job_id: str) -> str:
+    """Terminates a running background job inside the container."""
+    job = _find_job(job_id)
+    if job is None:
+        return f"Error: No job named '{job_id}'."
+    if job["exit_code"] is not None:
+        return f"{job['id']} has already finished."
+    # The PID line is the job's first output; give a just-submitted job a moment to report it
+    deadline = time.time() + 5
+    while job["pid"] is None and job["process"].poll() is None and time.time() < deadline:
+        time.sleep(0.1)
+    if job["process"].poll() is not None:
+        return f"{job['id']} has already finished."
+    if job["pid"] is None:
+        # Killing only the local `docker exec` client would leave the command running in the container
+        return f"Error: {job['id']} has not reported its container PID yet. Try again in a moment."
+    try:
+        subprocess.run(
+            ["docker", "exec", job["container_name"], "sh", "-c", f"pkill -TERM -P {job['pid']}; kill -TERM {job['pid']}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=15
+        )
+    except subprocess.TimeoutExpired:
+        return f"Error: Docker did not respond while cancelling {job['id']}; the job may still be running."
+    job["cancelled"] = True
+    try:
+        job["process"].wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        job["process"].kill()
+    return f"{job['id']} cancelled."
 
 ## -!- END REGISTER TOOL -!- ##
@@ -0,0 +1,62 @@
+## -!- START REGISTER TOOL -!- ##
+## -!- START TOOL DEFINITION -!- ##
+TOOL_NAME = "sub_agents"
+TOOL_DESCRIPTION = "把可以互相独立完成的多个子任务（例如分别调研几个库、分别检查几个文件）交给并行的子助手。每个子助手有独立的上下文并可使用只读工具，完成后返回简短结论，主对话只接收结论。每个子任务的描述要完整、可独立理解。"
+TOOL_FUNCTIONS = ["spawn_sub_agents"]
+TOOL_PARAMETERS = [
+    [
+        {"tasks": "子任务列表，每项是一个完整的任务描述"}
+    ]
+]
+## -!- END TOOL DEFINITION -!- ##
+
+import asyncio
+from config_manage.manager import ConfigManager
+from core.tools import tools, read_only_tools
+from core.tools.result_compactor import keep_head_tail
+from core.tools.tool_executor import execute_tool
+from core.utils.session import get_session
+from core.utils.tracing import span
+
+config = ConfigManager()
+
+def _child_tools() -> list[dict]:
+    names = read_only_tools if config.get("tools_api_config.sub_agents.tools", "read_only") == "read_only" else None
+    return [
+        tool for tool in tools
+        if tool["function"]["name"] != "spawn_sub_agents" and (names is None or tool["function"]["name"] in names)
+    ]
+
+async def spawn_sub_agents(tasks: list[str]) -> str:
+    parent = get_session().ai
+    if parent is None:
+        return "错误：当前会话不支持子助手"
+    if isinstance(tasks, str):
+        tasks = [tasks]
+    tasks = [str(task).strip() for task in tasks if str(task).strip()]
+    max_tasks = config.get("tools_api_config.sub_agents.max_tasks", 8)
+    if not tasks:
+        return "错误：没有提供子任务"
+    if len(tasks) > max_tasks:
+        return f"错误：子任务最多 {max_tasks} 个，当前 {len(tasks)} 个"
+
+    with open("core/prompts/sub_agent.txt", "r", encoding="utf-8") as f:
+        system_prompt = f.read()
+    child_tools = _child_tools()
+    semaphore = asyncio.Semaphore(config.get("tools_api_config.sub_agents.max_concurrency", 4))
+    max_rounds = config.get("tools_api_config.sub_agents.max_tool_rounds", 8)
+    result_chars = config.get("tools_api_config.sub_agents.result_chars", 2000)
+
+    async def run(index: int, task: str) -> str:
+        async with semaphore:
+            with span("agent.sub_agent", index=index):
+                child = parent.fork(system_prompt, child_tools or None)
+                answer = await child.chat_with_tools(task, tool_executor=execute_tool, max_tool_rounds=max_rounds)
+                return keep_head_tail(answer or "", result_chars)
+
+    results = await asyncio.gather(*(run(i, task) for i, task in enumerate(tasks, 1)), return_exceptions=True)
+    return "\n\n".join(
+        f"## 子任务 {i}: {task}\n" + (f"错误：{type(result).__name__}: {result}" if isinstance(result, BaseException) else result)
+        for i, (task, result) in enumerate(zip(tasks, results), 1)
+    )
+## -!- END REGISTER TOOL -!- ##
@@ -6,11 +6,12 @@
 ## -!- START REGISTER TOOL -!- ##
 ## -!- START TOOL DEFINITION -!- ##
 TOOL_NAME = "time"
-TOOL_DESCRIPTION = "全面的时间日期处理工具，支持获取当前时间、时区转换、时间计算、格式化、计时器和秒表功能。每次开始对话你都应该使用他来获取当前时间和日期。"
+TOOL_DESCRIPTION = "全面的时间日期处理工具，支持获取当前时间、时区转换、时间计算、格式化、计时器和秒表功能。每次开始对话你都应该使用他来获取当前时间和日期。计时器到时后你会自动收到一条系统通知，无需轮询；未到时的计时器在程序重启后仍然有效。"
 TOOL_FUNCTIONS = [
     "get_current_time",
     "get_time_with_timezone",
     "convert_timezone",
+    "batch_convert_timezone",
     "add_time",
     "format_datetime",
     "timestamp_to_datetime",
@@ -29,6 +30,11 @@ TOOL_PARAMETERS = [
         {"from_timezone": "源时区名称"},
         {"to_timezone": "目标时区名称"}
     ],
+    [
+        {"datetimes": "要转换的时间列表，每项为 'YYYY-MM-DD HH:MM:SS' 格式的日期时间、Unix时间戳（秒）或 'now'"},
+        {"from_timezone": "日期时间字符串所在的源时区名称，默认为 'Asia/Shanghai'（Unix时间戳与时区无关）"},
+        {"to_timezones": "目标时区名称列表，每个时间都会转换到列表中的每个时区"}
+    ],
     [
         {"base_datetime": "基准日期时间字符串 (格式: YYYY-MM-DD HH:MM:SS)"},
         {"days": "要添加的天数 (可以是负数)"},
@@ -42,7 +48,10 @@ TOOL_PARAMETERS = [
     ],
     [{"timestamp": "Unix时间戳 (秒)"}],
     [{"datetime_str": "日期时间字符串 (格式: YYYY-MM-DD HH:MM:SS)"}],
-    [{"timer_name": "计时器名称 (可选，用于区分多个计时器)"}],
+    [
+        {"seconds": "计时器时长（秒）"},
+        {"timer_name": "计时器名称 (可选，用于区分多个计时器)"}
+    ],
     [{"timer_name": "计时器名称 (可选)"}],
     [{"stopwatch_name": "秒表名称 (可选)"}],
     [{"stopwatch_name": "秒表名称 (可选)"}],
@@ -51,17 +60,51 @@ TOOL_PARAMETERS = [
         {"end_time": "结束时间字符串 (格式: YYYY-MM-DD HH:MM:SS)"}
     ]
 ]
+TOOL_READ_ONLY = [
+    "get_current_time",
+    "get_time_with_timezone",
+    "convert_timezone",
+    "batch_convert_timezone",
+    "add_time",
+    "format_datetime",
+    "timestamp_to_datetime",
+    "datetime_to_timestamp",
+    "get_time_difference"
+]
 ## -!- END TOOL DEFINITION -!- ##
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import time
 from typing import Optional, Dict, Any
 import json
+from core.utils.session import get_session
+from core.utils.timers import timers
+
+
+# 秒表存储（内存中，按会话区分，停止后即移除）；计时器由时间轮调度，见 core/utils/timers.py
+_stopwatches: Dict[tuple, Dict[str, Any]] = {}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 单次批量转换的最大结果条数（时间数 × 目标时区数）
+MAX_BATCH_RESULTS = 500
+
+
+@lru_cache(maxsize=256)
+def _zone(name: str) -> ZoneInfo:
+    """按名称缓存时区对象，无效名称抛出 ZoneInfoNotFoundError"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        # ValueError: 如 '../etc' 之类的非法键
+        raise ZoneInfoNotFoundError(name) from e
 
 
-# 计时器和秒表存储（内存中）
-_timers: Dict[str, Dict[str, Any]] = {}
-_stopwatches: Dict[str, Dict[str, Any]] = {}
+@lru_cache(maxsize=1024)
+def _parse_datetime(datetime_str: str, format_str: str = DATETIME_FORMAT) -> datetime:
+    """缓存的 strptime，datetime 不可变，可以安全复用"""
+    return datetime.strptime(datetime_str, format_str)
 
 
 def get_current_time() -> str:
@@ -88,12 +131,10 @@ def get_time_with_timezone(timezone: str = "Asia/Shanghai") -> str:
         格式为 "YYYY-MM-DD HH:MM:SS TZ" 的时间字符串
     """
     try:
-        import pytz
-        tz = pytz.timezone(timezone)
-        now = datetime.now(tz)
+        now = datetime.now(_zone(timezone))
         return now.strftime("%Y-%m-%d %H:%M:%S %Z")
-    except ImportError:
-        return f"错误：需要安装 pytz 库才能使用时区功能。当前本地时间: {get_current_time()}"
+    except ZoneInfoNotFoundError:
+        return f"错误：无效的时区 '{timezone}'"
     except Exception as e:
         return f"错误：无效的时区 '{timezone}'。{str(e)}"
 
@@ -118,24 +159,85 @@ def convert_timezone(
         convert_timezone("2025-12-07 15:30:00", "Asia/Shanghai", "America/New_York")
     """
     try:
-        import pytz
-        from_timezone_obj = pytz.timezone(from_timezone)
-        to_timezone_obj = pytz.timezone(to_timezone)
-
-        # 解析日期时间字符串
-        dt = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
-        dt = from_timezone_obj.localize(dt)
+        # 解析日期时间字符串并附加源时区
+        dt = _parse_datetime(datetime_str).replace(tzinfo=_zone(from_timezone))
 
         # 转换时区
-        dt_converted = dt.astimezone(to_timezone_obj)
+        dt_converted = dt.astimezone(_zone(to_timezone))
 
         return dt_converted.strftime("%Y-%m-%d %H:%M:%S %Z")
-    except ImportError:
-        return "错误：需要安装 pytz 库才能使用时区功能"
+    except ZoneInfoNotFoundError as e:
+        return f"错误：无效的时区 {e.args[0]!r}"
     except Exception as e:
         return f"错误：{str(e)}"
 
 
+def _resolve_instant(value, from_tz: ZoneInfo) -> datetime:
+    """把批量转换中的一项解析为带时区的时间：'now'、Unix时间戳或源时区下的日期时间字符串"""
+    text = str(value).strip()
+    if text.lower() == "now":
+        return datetime.now(dt_timezone.utc)
+    try:
+        return datetime.fromtimestamp(float(text), dt_timezone.utc)
+    except ValueError:
+        return _parse_datetime(text).replace(tzinfo=from_tz)
+
+
+def batch_convert_timezone(
+    datetimes: list[str],
+    from_timezone: str = "Asia/Shanghai",
+    to_timezones: list[str] = None
+) -> str:
+    """
+    一次把多个时间转换到多个时区（行程、日志时间线等场景只需一次工具调用）
+
+    参数:
+        datetimes: 时间列表，每项为 "YYYY-MM-DD HH:MM:SS"（按 from_timezone 解释）、Unix时间戳或 "now"
+        from_timezone: 日期时间字符串的源时区
+        to_timezones: 目标时区列表，默认为 ["UTC"]
+
+    返回:
+        每个时间一行，列出其在各目标时区的时间；单项出错不影响其他项
+
+    示例:
+        batch_convert_timezone(["2025-12-07 09:00:00", "1765000000"], "Asia/Shanghai", ["America/New_York", "Europe/London"])
+    """
+    if isinstance(datetimes, (str, int, float)):
+        datetimes = [datetimes]
+    if isinstance(to_timezones, str):
+        to_timezones = [to_timezones]
+    to_timezones = list(to_timezones or ["UTC"])
+    if not datetimes:
+        return "错误：没有提供要转换的时间"
+    if len(datetimes) * len(to_timezones) > MAX_BATCH_RESULTS:
+        return f"错误：一次最多转换 {MAX_BATCH_RESULTS} 个结果，当前 {len(datetimes)} 个时间 × {len(to_timezones)} 个时区"
+
+    try:
+        from_tz = _zone(from_timezone)
+    except ZoneInfoNotFoundError:
+        return f"错误：无效的源时区 '{from_timezone}'"
+    zones = []
+    for name in to_timezones:
+        try:
+            zones.append((name, _zone(name)))
+        except ZoneInfoNotFoundError:
+            zones.append((name, None))
+
+    lines = []
+    for value in datetimes:
+        try:
+            instant = _resolve_instant(value, from_tz)
+        except Exception as e:
+            lines.append(f"{value}: 错误：{str(e)}")
+            continue
+        parts = [
+            f"{name} {instant.astimezone(tz).strftime('%Y-%m-%d %H:%M:%S %Z')}" if tz is not None else f"{name} 错误：无效的时区"
+            for name, tz in zones
+        ]
+        lines.append(f"{value} -> " + "; ".join(parts))
+    return "\n".join(lines)
+
+
 def add_time(
     base_datetime: str,
     days: int = 0,
@@ -161,7 +263,7 @@ def add_time(
         add_time("2025-12-07 10:00:00", days=-1)  # 减去1天
     """
     try:
-        dt = datetime.strptime(base_datetime, "%Y-%m-%d %H:%M:%S")
+        dt = _parse_datetime(base_datetime)
         delta = timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
         new_dt = dt + delta
         return new_dt.strftime("%Y-%m-%d %H:%M:%S")
@@ -186,7 +288,7 @@ def format_datetime(datetime_str: str, format_str: str) -> str:
         格式化后的日期时间字符串
     """
     try:
-        dt = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
+        dt = _parse_datetime(datetime_str)
         return dt.strftime(format_str)
     except Exception as e:
         return f"错误：{str(e)}"
@@ -220,7 +322,7 @@ def datetime_to_timestamp(datetime_str: str) -> float:
         Unix时间戳（秒）
     """
     try:
-        dt = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
+        dt = _parse_datetime(datetime_str)
         return dt.timestamp()
     except Exception as e:
         return -1.0
@@ -228,7 +330,7 @@ def datetime_to_timestamp(datetime_str: str) -> float:
 
 def start_timer(seconds: int, timer_name: str = "default") -> str:
     """
-    启动一个倒计时计时器
+    启动一个倒计时计时器，到时后会向对话推送通知
 
     参数:
         seconds: 计时器时长（秒）
@@ -237,23 +339,22 @@ def start_timer(seconds: int, timer_name: str = "default") -> str:
     返回:
         计时器启动成功的确认信息
     """
-    if timer_name in _timers and not _timers[timer_name].get("finished", True):
-        return f"错误：计时器 '{timer_name}' 已在运行中"
+    try:
+        seconds = float(seconds)
+    except (ValueError, TypeError):
+        return f"错误：无效的时长 '{seconds}'"
+    if seconds <= 0:
+        return "错误：计时器时长必须大于0"
 
-    end_time = time.time() + seconds
-    _timers[timer_name] = {
-        "start_time": time.time(),
-        "end_time": end_time,
-        "duration": seconds,
-        "finished": False
-    }
+    if timers.start(get_session(), timer_name, seconds) is None:
+        return f"错误：计时器 '{timer_name}' 已在运行中"
 
-    return f"计时器 '{timer_name}' 已启动: {seconds} 秒"
+    return f"计时器 '{timer_name}' 已启动: {seconds:g} 秒，到时后会自动通知"
 
 
 def stop_timer(timer_name: str = "default") -> str:
     """
-    停止计时器并返回剩余时间或已过时间
+    停止计时器并返回剩余时间
 
     参数:
         timer_name: 计时器名称
@@ -261,20 +362,12 @@ def stop_timer(timer_name: str = "default") -> str:
     返回:
         计时器状态信息
     """
-    if timer_name not in _timers:
-        return f"错误：计时器 '{timer_name}' 不存在"
-
-    timer_info = _timers[timer_name]
-    current_time = time.time()
+    timer_info = timers.cancel(get_session(), timer_name)
+    if timer_info is None:
+        return f"错误：计时器 '{timer_name}' 不存在或已到时"
 
-    if current_time >= timer_info["end_time"]:
-        _timers[timer_name]["finished"] = True
-        elapsed = current_time - timer_info["end_time"]
-        return f"计时器 '{timer_name}' 已在 {elapsed:.1f} 秒前结束"
-    else:
-        remaining = timer_info["end_time"] - current_time
-        _timers[timer_name]["finished"] = True
-        return f"计时器 '{timer_name}' 已停止，剩余 {remaining:.1f} 秒"
+    remaining = max(0.0, timer_info["end_time"] - time.time())
+    return f"计时器 '{timer_name}' 已停止，剩余 {remaining:.1f} 秒"
 
 
 def start_stopwatch(stopwatch_name: str = "default") -> str:
@@ -287,12 +380,12 @@ def start_stopwatch(stopwatch_name: str = "default") -> str:
     返回:
         秒表启动确认信息
     """
-    if stopwatch_name in _stopwatches:
+    key = (get_session().session_id, stopwatch_name)
+    if key in _stopwatches:
         return f"秒表 '{stopwatch_name}' 已在运行中"
 
-    _stopwatches[stopwatch_name] = {
-        "start_time": time.time(),
-        "running": True
+    _stopwatches[key] = {
+        "start_time": time.time()
     }
 
     return f"秒表 '{stopwatch_name}' 已启动"
@@ -308,16 +401,11 @@ def stop_stopwatch(stopwatch_name: str = "default") -> str:
     返回:
         经过的时间（秒）
     """
-    if stopwatch_name not in _stopwatches:
-        return f"错误：秒表 '{stopwatch_name}' 不存在"
-
-    stopwatch_info = _stopwatches[stopwatch_name]
-
-    if not stopwatch_info["running"]:
-        return f"秒表 '{stopwatch_name}' 已停止"
+    stopwatch_info = _stopwatches.pop((get_session().session_id, stopwatch_name), None)
+    if stopwatch_info is None:
+        return f"错误：秒表 '{stopwatch_name}' 不存在或已停止"
 
     elapsed = time.time() - stopwatch_info["start_time"]
-    _stopwatches[stopwatch_name]["running"] = False
 
     hours = int(elapsed // 3600)
     minutes = int((elapsed % 3600) // 60)
@@ -343,8 +431,8 @@ def get_time_difference(start_time: str, end_time: str) -> str:
         时间差描述
     """
     try:
-        dt1 = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
-        dt2 = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S")
+        dt1 = _parse_datetime(start_time)
+        dt2 = _parse_datetime(end_time)
 
         if dt2 < dt1:
             return "错误：结束时间不能早于开始时间"
@@ -374,17 +462,5 @@ def get_time_difference(start_time: str, end_time: str) -> str:
         return f"错误：{str(e)}"
 
 
-# 清理已完成的计时器（可选的维护功能）
-def _cleanup_timers():
-    """清理已完成的计时器"""
-    current_time = time.time()
-    finished_timers = [
-        name for name, info in _timers.items()
-        if current_time >= info["end_time"] and not info.get("finished", False)
-    ]
-    for timer_name in finished_timers:
-        _timers[timer_name]["finished"] = True
-
-
 ## -!- END REGISTER TOOL -!- ##
 
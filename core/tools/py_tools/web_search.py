@@ -1,24 +1,30 @@
-
 ## -!- START REGISTER TOOL -!- ##
 ## -!- START TOOL DEFINITION -!- ##
 TOOL_NAME = "web_search"
 TOOL_DESCRIPTION = "Search the web using google. If the tool return an url, you should use other tool to get the content."
 TOOL_FUNCTIONS = ["web_search"]
 TOOL_PARAMETERS = [[{"query": "The search query.","engine": "The search engine to use, such as google, duckduckgo, github, etc. Default is google.", "max_length": "The maximum number of length to return in the response. Default is 3000."}]]
+TOOL_READ_ONLY = ["web_search"]
 ## -!- END TOOL DEFINITION -!- ##
 
-from langchain_community.utilities import SearxSearchWrapper
 from config_manage.manager import ConfigManager
 config = ConfigManager()
-if config.get("tools_api_config.web_search.enable") == True:
-    searx_host = config.get("tools_api_config.web_search.base_url")
-    s = SearxSearchWrapper(searx_host=searx_host)
+_searx = None
+
+def _get_searx():
+    # langchain_community is slow to import, so it is only loaded on the first search
+    global _searx
+    if _searx is None:
+        from langchain_community.utilities import SearxSearchWrapper
+        _searx = SearxSearchWrapper(searx_host=config.get("tools_api_config.web_search.base_url"))
+    return _searx
 
 def web_search(query: str, engine: str = "google", max_length: int = 3000) -> str:
-    if config.get("tools_api_config.web_search.enable") == False:
+    if config.get("tools_api_config.web_search.enable") != True:
         return "Web search tool is disabled."
+    s = _get_searx()
     result = s.run(query=query, engines=engine)
     if result == 'No good search result found':
         result = s.run(query=query, engines=[engine])
     return str(result)[:max_length] if len(str(result)) > max_length else str(result)
-## -!- END REGISTER TOOL -!- ##
\ No newline at end of file
+## -!- END REGISTER TOOL -!- ##
@@ -0,0 +1,69 @@
+import re
+
+# CSI (colors, cursor movement), OSC (window titles, hyperlinks) and two-byte escape sequences
+ANSI_RE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+BACKSPACE_RE = re.compile(r"[^\n]\x08")
+
+def strip_terminal_sequences(text: str) -> str:
+    """Removes ANSI escapes and control characters; `\\r` overwrites (progress bars) keep only the final state."""
+    text = ANSI_RE.sub("", text)
+    while "\x08" in text:
+        reduced = BACKSPACE_RE.sub("", text)
+        if reduced == text:
+            break
+        text = reduced
+    text = text.replace("\r\n", "\n")
+    if "\r" in text:
+        text = "\n".join(line.rsplit("\r", 1)[-1] if "\r" in line.rstrip("\r") else line.rstrip("\r") for line in text.split("\n"))
+    return CONTROL_RE.sub("", text)
+
+def collapse_repeated_lines(text: str, min_repeats: int = 3) -> str:
+    """Replaces runs of identical consecutive lines with one copy and a repeat count."""
+    lines = text.split("\n")
+    out = []
+    i = 0
+    while i < len(lines):
+        j = i
+        while j + 1 < len(lines) and lines[j + 1] == lines[i]:
+            j += 1
+        count = j - i + 1
+        if count >= min_repeats:
+            out.append(lines[i])
+            out.append(f"[上一行重复 {count - 1} 次]")
+        else:
+            out.extend(lines[i:j + 1])
+        i = j + 1
+    return "\n".join(out)
+
+def _snap_head(head: str) -> str:
+    cut = head.rfind("\n")
+    return head[:cut] if cut >= len(head) * 0.7 else head
+
+def _snap_tail(tail: str) -> str:
+    cut = tail.find("\n")
+    return tail[cut + 1:] if 0 <= cut <= len(tail) * 0.3 else tail
+
+def keep_head_tail(text: str, budget: int, encoding=None, head_share: float = 0.6) -> str:
+    """
+    Shortens `text` to about `budget` tokens (or characters without an encoding),
+    keeping the beginning and the end with an elision marker in between.
+    """
+    units = encoding.encode(text, disallowed_special=()) if encoding else text
+    if len(units) <= budget:
+        return text
+    budget = max(budget - 24, 16) # room for the marker
+    head_len = int(budget * head_share)
+    tail_len = budget - head_len
+    if encoding:
+        head, tail = encoding.decode(units[:head_len]), encoding.decode(units[-tail_len:])
+    else:
+        head, tail = text[:head_len], text[-tail_len:]
+    head, tail = _snap_head(head), _snap_tail(tail)
+    omitted = text[len(head):len(text) - len(tail)]
+    unit = "tokens" if encoding else "字符"
+    omitted_size = len(encoding.encode(omitted, disallowed_special=())) if encoding else len(omitted)
+    return f"{head}\n...[已省略 {omitted.count(chr(10)) + 1} 行，约 {omitted_size} {unit}]...\n{tail}"
+
+def clean_tool_output(text: str) -> str:
+    return collapse_repeated_lines(strip_terminal_sequences(text))
@@ -1,17 +1,45 @@
 import importlib
+import ast
 import os
 import json
 import asyncio
+import contextvars
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config_manage.manager import ConfigManager
 from core.tools import mcp_tool_names, execute_mcp_tools
+from core.utils.tracing import span, metrics, current_span
+from core.utils.tool_runtime import CappedBuffer, install_output_router, tool_call_context
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 _TOOL_CACHE = {}
+_TOOL_INDEX = {} # function name -> module path, filled without importing the modules
+
+def _register_module(module_path: str):
+    """Imports a tool module and registers its public callables into the cache."""
+    module = importlib.import_module(module_path)
+    # Register all functions in the module that don't start with _
+    for attr_name in dir(module):
+        if not attr_name.startswith("_"):
+            attr = getattr(module, attr_name)
+            # Only register callables defined in the module itself to avoid registering imports
+            if callable(attr) and getattr(attr, "__module__", None) == module.__name__:
+                _TOOL_CACHE[attr_name] = attr
+
+def _resolve_tool(tool_name: str):
+    """Returns the cached tool callable, importing its module on first use."""
+    if tool_name not in _TOOL_CACHE and tool_name in _TOOL_INDEX:
+        try:
+            _register_module(_TOOL_INDEX[tool_name])
+        except Exception as e:
+            logger.error(f"Failed to import tool module {_TOOL_INDEX[tool_name]}: {e}")
+    return _TOOL_CACHE.get(tool_name)
 
 def _load_tools():
-    """Scans and loads all tools from py_tools directory into cache."""
+    """Scans the py_tools directory and indexes its public functions; modules are imported lazily."""
     try:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         py_tools_dir = os.path.join(current_dir, "py_tools")
@@ -26,25 +54,101 @@ def _load_tools():
                 module_path = f"core.tools.py_tools.{module_name}"
 
                 try:
-                    module = importlib.import_module(module_path)
-                    # Register all functions in the module that don't start with _
-                    for attr_name in dir(module):
-                        if not attr_name.startswith("_"):
-                            attr = getattr(module, attr_name)
-                            # Only register callables defined in the module itself to avoid registering imports
-                            if callable(attr) and getattr(attr, "__module__", None) == module.__name__:
-                                _TOOL_CACHE[attr_name] = attr
-                                
+                    with open(os.path.join(py_tools_dir, filename), "r", encoding="utf-8") as f:
+                        parsed = ast.parse(f.read())
+                    for node in parsed.body:
+                        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and not node.name.startswith("_"):
+                            _TOOL_INDEX[node.name] = module_path
                 except Exception as e:
-                    logger.error(f"Failed to import tool module {module_name}: {e}")
+                    logger.error(f"Failed to index tool module {module_name}: {e}")
                     continue
     except Exception as e:
         logger.error(f"Error loading tools: {e}")
 
-# Load tools on import
+# Index tools on import
 _load_tools()
 
+# Tool prints are captured per call instead of reaching the terminal
+install_output_router()
+
+_config = ConfigManager("config.json")
+_pool: ThreadPoolExecutor | None = None
+
+def _tool_pool() -> ThreadPoolExecutor:
+    """Worker threads for sync tools, so a blocking tool never stalls the event loop."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=_config.get("tools_api_config.executor.max_workers", 8),
+            thread_name_prefix="muli-tool"
+        )
+    return _pool
+
+def _retire_pool(pool: ThreadPoolExecutor):
+    """
+    Replaces a pool holding a call that outlived its timeout. The stuck thread cannot be
+    killed; the old pool finishes what it is running and exits, while new calls get fresh workers.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+        metrics.inc("muli_tool_pool_retired_total")
+    pool.shutdown(wait=False)
+
+def _tool_timeout(tool_name: str) -> float:
+    return _config.get(f"tools_api_config.executor.timeouts.{tool_name}", _config.get("tools_api_config.executor.timeout", 120))
+
+def _call_with_context(tool_func, args_dict: dict, buffer: CappedBuffer, cancel_event: threading.Event):
+    with tool_call_context(buffer, cancel_event):
+        return tool_func(**args_dict)
+
+async def _run_py_tool(tool_name: str, tool_func, args_dict: dict) -> str:
+    """
+    Runs a py_tool with a timeout. Sync tools run in the worker pool (with the caller's context,
+    so per-session state resolves); stdout/stderr are captured per call and attached to the span.
+    Threads cannot be killed, so on timeout or cancellation the call's cancel event is set and
+    cooperative tools (see core.utils.tool_runtime) stop early; if the call is still running, its
+    pool is retired so a wedged tool never occupies a worker that later calls wait for.
+    """
+    buffer = CappedBuffer(_config.get("tools_api_config.executor.output_limit", 8000))
+    cancel_event = threading.Event()
+    timeout = _tool_timeout(tool_name)
+    pool = call = None
+    try:
+        if asyncio.iscoroutinefunction(tool_func):
+            with tool_call_context(buffer, cancel_event):
+                result = await asyncio.wait_for(tool_func(**args_dict), timeout)
+        else:
+            context = contextvars.copy_context()
+            pool = _tool_pool()
+            call = pool.submit(context.run, _call_with_context, tool_func, args_dict, buffer, cancel_event)
+            result = await asyncio.wait_for(asyncio.wrap_future(call), timeout)
+        return str(result)
+    except TimeoutError:
+        cancel_event.set()
+        metrics.inc("muli_tool_timeouts_total", tool=tool_name)
+        return f"错误：工具 '{tool_name}' 执行超过 {timeout} 秒，已取消"
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
+    finally:
+        if call is not None and not call.done():
+            _retire_pool(pool)
+        output = buffer.getvalue()
+        if output and (tool_span := current_span()) is not None:
+            tool_span.set(output=output)
+
 async def execute_tool(tool_name: str, arguments) -> str:
+    with span("tool.execute", tool=tool_name) as tool_span:
+        result = await _execute_tool(tool_name, arguments)
+        metrics.inc("muli_tool_calls_total", tool=tool_name)
+        if result.startswith("错误"):
+            tool_span.set(error=result[:200])
+            metrics.inc("muli_tool_errors_total", tool=tool_name)
+        tool_span.set(result_chars=len(result))
+        return result
+
+async def _execute_tool(tool_name: str, arguments) -> str:
     try:
         # Normalize arguments
         if isinstance(arguments, str):
@@ -60,14 +164,10 @@ async def execute_tool(tool_name: str, arguments) -> str:
             return await execute_mcp_tools(tool_name, args_dict)
 
         # 2. Check Python Tools (Cached)
-        if tool_name in _TOOL_CACHE:
-            tool_func = _TOOL_CACHE[tool_name]
+        tool_func = _resolve_tool(tool_name)
+        if tool_func is not None:
             try:
-                if asyncio.iscoroutinefunction(tool_func):
-                    result = await tool_func(**args_dict)
-                else:
-                    result = tool_func(**args_dict)
-                return str(result)
+                return await _run_py_tool(tool_name, tool_func, args_dict)
             except TypeError as te:
                  return f"错误：工具 '{tool_name}' 参数不匹配: {str(te)}"
             except Exception as e:
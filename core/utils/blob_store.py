@@ -0,0 +1,62 @@
+import hashlib
+import os
+import zlib
+from functools import lru_cache
+
+BLOB_PREFIX = "sha256:"
+
+class BlobStore:
+    """
+    Deduplicated, zlib-compressed, content-addressed text store.
+
+    A blob lives at `<root>/<first two hex chars>/<rest>.z`; writing the same
+    content twice is a no-op, so identical tool outputs are stored once.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:] + ".z")
+
+    @staticmethod
+    def _digest(blob_id: str) -> str:
+        digest = blob_id.removeprefix(BLOB_PREFIX)
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"无效的 blob_id: {blob_id}")
+        return digest
+
+    def put(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp, path) # Atomic, so readers never see a partial blob
+        return BLOB_PREFIX + digest
+
+    def get(self, blob_id: str) -> str:
+        return _read_blob(self._path(self._digest(blob_id)))
+
+    def exists(self, blob_id: str) -> bool:
+        return os.path.exists(self._path(self._digest(blob_id)))
+
+@lru_cache(maxsize=32)
+def _read_blob(path: str) -> str:
+    # Blobs are immutable, so decompressed text can be cached by path
+    with open(path, "rb") as f:
+        return zlib.decompress(f.read()).decode("utf-8")
+
+def spill_large_text(store: BlobStore, text: str, threshold_chars: int, preview: str) -> str:
+    """Stores `text` in the blob store if it is large and returns a reference followed by `preview`."""
+    if len(text) <= threshold_chars:
+        return text
+    blob_id = store.put(text)
+    return (
+        f"[BLOB {blob_id} size={len(text)} chars] 内容过长，完整结果已存储，"
+        f"以下为节选，可使用 read_blob 工具按偏移量读取完整内容。\n"
+        f"{preview}"
+    )
@@ -0,0 +1,54 @@
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+MAX_BODY = 1 << 20
+
+class HTTPRequest:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, target: str, headers: dict, body: bytes):
+        parts = urlsplit(target)
+        self.method, self.path, self.query = method.upper(), parts.path, parse_qs(parts.query)
+        self.headers, self.body = headers, body
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+async def read_request(reader: asyncio.StreamReader) -> HTTPRequest | None:
+    """Reads one HTTP/1.1 request from the stream. Returns None on EOF."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return HTTPRequest(method, target, headers, body)
+
+async def write_response(writer: asyncio.StreamWriter, status: int, body=b"", content_type: str = "application/json"):
+    if not isinstance(body, (bytes, bytearray)):
+        body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+async def start_sse(writer: asyncio.StreamWriter):
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+
+async def write_sse(writer: asyncio.StreamWriter, event: str | None, data):
+    # A data line must not contain raw newlines, so anything but a plain one-line string is JSON-encoded
+    payload = data if isinstance(data, str) and "\n" not in data else json.dumps(data, ensure_ascii=False)
+    prefix = f"event: {event}\n" if event else ""
+    writer.write(f"{prefix}data: {payload}\n\n".encode("utf-8"))
+    await writer.drain()
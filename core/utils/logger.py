@@ -1,23 +1,40 @@
 import json
 import os
 import time
+from array import array
 from typing import Literal
+from core.utils.tracing import traced
 
 class DisplayLogger:
+    """
+    Append-only display log, one JSON entry per line in `screen.jsonl`.
+
+    Logging appends a line instead of rewriting the file. Reads go to disk:
+    `tail` scans backwards from the end, and `page` seeks through an index of
+    line offsets that is built on first use, so the entries are never all in memory.
+    """
+
     def __init__(self, log_dir="history"):
         self.log_dir = log_dir
         os.makedirs(self.log_dir, exist_ok=True)
-        self.log_file = os.path.join(self.log_dir, "screen.json")
-        self.entries = []
-        self._load()
+        self.log_file = os.path.join(self.log_dir, "screen.jsonl")
+        self._offsets: array | None = None # Byte offset of every line, built lazily
+        self._migrate(os.path.join(self.log_dir, "screen.json"))
 
-    def _load(self):
-        if os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, "r", encoding="utf-8") as f:
-                    self.entries = json.load(f)
-            except Exception:
-                self.entries = []
+    def _migrate(self, legacy_file: str):
+        """Converts the old single-array `screen.json` into JSON lines once."""
+        if not os.path.exists(legacy_file) or os.path.exists(self.log_file):
+            return
+        try:
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            with open(self.log_file + ".tmp", "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(self.log_file + ".tmp", self.log_file)
+            os.remove(legacy_file)
+        except Exception:
+            pass
 
     def log(self, role: str, content: str, type: Literal["text", "markdown", "tool"] = "text"):
         entry = {
@@ -26,13 +43,79 @@ class DisplayLogger:
             "content": content,
             "type": type
         }
-        self.entries.append(entry)
-        self._save()
+        self._append(entry)
 
-    def _save(self):
+    @traced("persist.display_log")
+    def _append(self, entry: dict):
         try:
-            with open(self.log_file, "w", encoding="utf-8") as f:
-                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self.log_file, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            if self._offsets is not None:
+                self._offsets.append(offset)
         except Exception as e:
             # Avoid crashing if logging fails, but maybe print to stderr
             pass
+
+    def _index(self) -> array:
+        if self._offsets is None:
+            offsets = array("Q")
+            try:
+                with open(self.log_file, "rb") as f:
+                    offset = 0
+                    for line in f:
+                        if line.strip():
+                            offsets.append(offset)
+                        offset += len(line)
+            except OSError:
+                pass
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    @staticmethod
+    def _parse(lines: list[bytes]) -> list[dict]:
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue # Torn last line after a crash
+        return entries
+
+    def tail(self, count: int) -> list[dict]:
+        """The last `count` entries, oldest first, read backwards from the end of the file."""
+        if count <= 0:
+            return []
+        try:
+            with open(self.log_file, "rb") as f:
+                end = f.seek(0, os.SEEK_END)
+                data, position = b"", end
+                while position > 0 and data.count(b"\n") <= count:
+                    step = min(65536, position)
+                    position -= step
+                    f.seek(position)
+                    data = f.read(step) + data
+        except OSError:
+            return []
+        lines = [line for line in data.split(b"\n") if line.strip()]
+        if position > 0:
+            lines = lines[1:] # The first line may be cut off
+        return self._parse(lines[-count:])
+
+    def page(self, page: int, page_size: int) -> list[dict]:
+        """Page 1 is the most recent `page_size` entries, page 2 the ones before them, and so on."""
+        offsets = self._index()
+        stop = len(offsets) - (page - 1) * page_size
+        start = max(0, stop - page_size)
+        if page < 1 or stop <= 0:
+            return []
+        lines = []
+        with open(self.log_file, "rb") as f:
+            f.seek(offsets[start])
+            for _ in range(stop - start):
+                lines.append(f.readline())
+        return self._parse(lines)
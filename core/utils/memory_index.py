@@ -0,0 +1,167 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from llms.message import Message
+
+MEMORY_MARKER = "[RECALLED_MEMORY]"
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_./\\:-]{2,}")
+_SPACE_RE = re.compile(r"\s+")
+
+def _features(text: str) -> list[str]:
+    """Character 2/3-grams (works for Chinese without a tokenizer) plus whole identifier-like words (paths, names, errors)."""
+    text = _SPACE_RE.sub(" ", text.lower()).strip()
+    grams = [text[i:i + n] for n in (2, 3) for i in range(len(text) - n + 1)]
+    grams.extend("w:" + word for word in _WORD_RE.findall(text))
+    return grams
+
+def embed(texts: list[str], dim: int):
+    """Signed feature hashing into `dim` buckets with sublinear counts, L2-normalized; returns a float32 (n, dim) matrix."""
+    import numpy as np
+
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in _features(text)), dtype=np.uint32)
+        if not hashes.size:
+            continue
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(hashes % dim, weights=signs, minlength=dim)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm:
+            matrix[row] = vector / norm
+    return matrix
+
+def message_text(msg: Message) -> str | None:
+    """One conversation message as plain `role: text`; None for system messages and empty turns."""
+    if msg.role == "system":
+        return None # Prompts, summaries and previously recalled memories are not conversation
+    content = msg.content
+    if not isinstance(content, str):
+        content = str(content or "")
+    parts = [content] if content else []
+    for _, name, arguments in msg.tool_calls:
+        parts.append(f"调用 {name}({arguments})")
+    return f"{msg.role}: " + "\n".join(parts) if parts else None
+
+def chunk_messages(messages: list[Message], chunk_chars: int = 800) -> list[str]:
+    """Flattens archived conversation messages into chunks of roughly `chunk_chars` characters, split on message boundaries."""
+    chunks, current, size = [], [], 0
+    for msg in messages:
+        line = message_text(msg)
+        if line is None:
+            continue
+        for start in range(0, len(line), chunk_chars):
+            piece = line[start:start + chunk_chars]
+            if current and size + len(piece) > chunk_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+class MemoryIndex:
+    """
+    Append-only long-term memory under `root`:
+
+        meta.json      {"dim": ...}
+        vectors.f32    row-major float32 matrix, memory-mapped for search
+        chunks.jsonl   one {"text", "ts"} record per matrix row
+    """
+
+    def __init__(self, root: str, dim: int = 1024):
+        self.root = root
+        self.vectors_path = os.path.join(root, "vectors.f32")
+        self.chunks_path = os.path.join(root, "chunks.jsonl")
+        self.dim = dim
+        meta_path = os.path.join(root, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"] # An existing index keeps the dimension it was built with
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._records: list[dict] | None = None
+
+    def __len__(self) -> int:
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _load(self):
+        import numpy as np
+
+        rows = len(self)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+            with open(self.chunks_path, "r", encoding="utf-8") as f:
+                self._records = [json.loads(line) for line in f][:rows]
+
+    def _repair(self):
+        """Cuts both files back to whole, matching rows, since records are paired with vectors by position."""
+        rows = len(self)
+        if os.path.exists(self.vectors_path):
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(rows * 4 * self.dim) # Drops a torn last row
+        if not os.path.exists(self.chunks_path):
+            return
+        with open(self.chunks_path, "r+b") as f:
+            end = 0
+            for _ in range(rows):
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+            f.truncate(end)
+
+    def add(self, texts: list[str]) -> int:
+        """Embeds and appends `texts`; returns how many rows were written."""
+        texts = [t for t in texts if t.strip()]
+        if not texts:
+            return 0
+        vectors = embed(texts, self.dim)
+        now = time.time()
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            meta_path = os.path.join(self.root, "meta.json")
+            if not os.path.exists(meta_path):
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            self._repair()
+            # Metadata first: a crash between the two writes leaves extra records, which the next add cuts off
+            with open(self.chunks_path, "a", encoding="utf-8") as f:
+                for text in texts:
+                    f.write(json.dumps({"text": text, "ts": now}, ensure_ascii=False) + "\n")
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            self._matrix = None
+        return len(texts)
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> list[dict]:
+        """Cosine top-k over the memory-mapped matrix; each hit is its record plus "score"."""
+        import numpy as np
+
+        with self._lock:
+            if not len(self):
+                return []
+            self._load()
+            matrix, records = self._matrix, self._records
+        scores = matrix @ embed([query], self.dim)[0]
+        top_k = min(top_k, scores.shape[0])
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        hits = []
+        for row in candidates[np.argsort(-scores[candidates])]:
+            if scores[row] < min_score:
+                break
+            hits.append({**records[row], "score": float(scores[row])})
+        return hits
+
+def format_hits(hits: list[dict]) -> str:
+    return "\n\n".join(
+        f"[记忆 {i} · 相似度 {hit['score']:.2f} · {time.strftime('%Y-%m-%d %H:%M', time.localtime(hit['ts']))}]\n{hit['text']}"
+        for i, hit in enumerate(hits, 1)
+    )
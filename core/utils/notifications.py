@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+class NotificationCenter:
+    """
+    Per-session inbox for events that happen outside a turn (e.g. a background
+    job finishing). Posting is thread-safe; the agent loop either awaits `wait`
+    while idle or drains the inbox at the start of its next turn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[str]] = defaultdict(list)
+        self._waiters: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = defaultdict(set)
+
+    def post(self, session_id: str, text: str):
+        with self._lock:
+            self._pending[session_id].append(text)
+            waiters = list(self._waiters[session_id])
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass # Loop already closed
+
+    def drain(self, session_id: str) -> list[str]:
+        with self._lock:
+            return self._pending.pop(session_id, [])
+
+    def has_pending(self, session_id: str) -> bool:
+        with self._lock:
+            return bool(self._pending.get(session_id))
+
+    async def wait(self, session_id: str):
+        """Returns once the session has at least one pending notification."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._pending.get(session_id):
+                return
+            self._waiters[session_id].add(waiter)
+        try:
+            await waiter[1].wait()
+        finally:
+            with self._lock:
+                self._waiters[session_id].discard(waiter)
+
+notifications = NotificationCenter()
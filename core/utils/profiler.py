@@ -0,0 +1,118 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf frames of threads parked in a blocking wait: idle pool workers, the event loop's selector,
+# a worker thread blocked in a C call such as input(). Kept in the flame graph, left out of the hot-function table
+IDLE_LEAVES = {
+    ("wait", "threading.py"),
+    ("join", "threading.py"),
+    ("_wait_for_tstate_lock", "threading.py"),
+    ("get", "queue.py"),
+    ("select", "selectors.py"),
+    ("_worker", "thread.py"),
+    ("run", "thread.py"),
+}
+
+class TurnProfiler:
+    """
+    Low-overhead sampling profiler for agent turns.
+
+    A background thread samples the stacks of all other threads every `interval`
+    seconds. Each turn is written as collapsed stacks (`thread;frame;frame count`)
+    that flamegraph.pl / speedscope read directly, and samples of threads that
+    are not idle are aggregated into a hot-function table until the next `dump`.
+    """
+
+    def __init__(self, out_dir: str = os.path.join("history", "profile"), interval: float = 0.005, top_n: int = 20):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.top_n = top_n
+        self.enabled = False
+        self.turn = 0
+        self._stacks: Counter = Counter()
+        self._reset_aggregate()
+        self._stop = None
+        self._thread = None
+
+    def _reset_aggregate(self):
+        self._self_samples: Counter = Counter()
+        self._total_samples: Counter = Counter()
+        self._samples = 0
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            idle = (frame.f_code.co_name, os.path.basename(frame.f_code.co_filename)) in IDLE_LEAVES
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            if not labels:
+                continue
+            labels.reverse()
+            self._stacks[";".join([names.get(thread_id, str(thread_id))] + labels)] += 1
+            if idle:
+                continue
+            self._self_samples[labels[-1]] += 1
+            for label in set(labels):
+                self._total_samples[label] += 1
+            self._samples += 1
+
+    def _run(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            self._sample()
+
+    def start_turn(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.turn += 1
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="muli-profiler", daemon=True)
+        self._thread.start()
+
+    def end_turn(self) -> str | None:
+        """Stops sampling and writes this turn's collapsed stacks. Returns the file path."""
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"turn-{int(time.time())}-{self.turn:04d}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def hot_functions(self) -> list[tuple[str, int, int]]:
+        """(function, self samples, total samples), hottest self time first."""
+        return [(label, count, self._total_samples[label]) for label, count in self._self_samples.most_common(self.top_n)]
+
+    def dump(self, console):
+        """Prints the top-N hot-function table and resets the aggregate."""
+        from rich.table import Table
+
+        if not self._samples:
+            console.print("[yellow]暂无采样数据，请先执行 /profile on 并进行一轮对话[/yellow]")
+            return
+        table = Table(title=f"热点函数 Top {self.top_n}（共 {self._samples} 个非空闲采样，间隔 {self.interval * 1000:.0f}ms）")
+        table.add_column("函数")
+        table.add_column("自身占比", justify="right")
+        table.add_column("累计占比", justify="right")
+        for label, self_count, total_count in self.hot_functions():
+            table.add_row(label, f"{self_count / self._samples:.1%}", f"{total_count / self._samples:.1%}")
+        console.print(table)
+        console.print(f"[dim]火焰图数据（collapsed stacks）位于 {self.out_dir}[/dim]")
+        self._reset_aggregate()
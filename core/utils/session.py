@@ -0,0 +1,25 @@
+from contextvars import ContextVar
+import os
+
+class SessionContext:
+    """Per-session state visible to tools running inside that session's turn."""
+    __slots__ = ("session_id", "history_dir", "ai")
+
+    def __init__(self, session_id: str = "default", history_dir: str = "history", ai=None):
+        self.session_id = session_id
+        self.history_dir = history_dir
+        self.ai = ai # The session's AIModel, for tools that fork sub-conversations
+
+    def path(self, *parts: str) -> str:
+        """Returns a path under this session's history directory, creating parent dirs."""
+        path = os.path.join(self.history_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+DEFAULT_SESSION = SessionContext()
+
+# Set by MuLi at the start of every turn; tools read it to find their per-session state.
+current_session: ContextVar[SessionContext] = ContextVar("current_session", default=DEFAULT_SESSION)
+
+def get_session() -> SessionContext:
+    return current_session.get()
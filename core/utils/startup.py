@@ -0,0 +1,85 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+class StartupTimer:
+    """Records how long each startup phase takes, so the wait before the first prompt can be broken down."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: list[dict] = []
+        self._depth = 0
+        self._reported_total: float | None = None
+
+    @contextmanager
+    def phase(self, name: str):
+        entry = {"phase": name, "depth": self._depth, "start": time.perf_counter() - self.origin}
+        self.phases.append(entry)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            entry["seconds"] = time.perf_counter() - self.origin - entry["start"]
+
+    def pending(self, name: str):
+        """Lists a background phase that is still running; `record` fills it in when it ends."""
+        self.phases.append({"phase": name, "depth": 0, "start": time.perf_counter() - self.origin, "pending": True})
+
+    def record(self, name: str, seconds: float):
+        """Adds a phase that ran elsewhere, e.g. in a background thread."""
+        entry = {"phase": name, "depth": 0, "start": time.perf_counter() - self.origin - seconds, "seconds": seconds}
+        for p in self.phases:
+            if p["phase"] == name and p.get("pending"):
+                p.clear()
+                p.update(entry)
+                return
+        self.phases.append(entry)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def to_dict(self) -> dict:
+        phases = [
+            {"phase": p["phase"], "depth": p["depth"], "start": p["start"], "seconds": None, "pending": True} if p.get("pending") else p
+            for p in self.phases if "seconds" in p or p.get("pending")
+        ]
+        return {"total_seconds": self._reported_total or self.total(), "phases": phases}
+
+    @staticmethod
+    def _seconds(p: dict) -> str:
+        return "后台进行中" if p.get("pending") else f"{p['seconds'] * 1000:.1f} ms"
+
+    def report(self, console, budget: float | None = None):
+        """Prints the phase table; `MULI_STARTUP_REPORT=<file>.json` writes it as JSON instead."""
+        target = os.environ.get("MULI_STARTUP_REPORT", "")
+        data = self.to_dict()
+        self._reported_total = data["total_seconds"]
+        if target.endswith(".json"):
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        elif target not in ("", "0"):
+            from rich.table import Table
+            table = Table(title=f"启动耗时 {data['total_seconds']:.3f}s")
+            table.add_column("阶段")
+            table.add_column("耗时", justify="right")
+            for p in data["phases"]:
+                table.add_row("  " * p["depth"] + p["phase"], self._seconds(p))
+            console.print(table)
+        if budget and data["total_seconds"] > budget:
+            console.print(f"[yellow]启动耗时 {data['total_seconds']:.2f}s 超出预算 {budget:.2f}s，可设置 MULI_STARTUP_REPORT=1 查看各阶段耗时[/yellow]")
+
+    def report_background(self, console, name: str):
+        """Reports a background phase that finished after `report`: rewrites the JSON file or prints one line."""
+        target = os.environ.get("MULI_STARTUP_REPORT", "")
+        if target.endswith(".json"):
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        elif target not in ("", "0"):
+            for p in self.phases:
+                if p["phase"] == name and "seconds" in p:
+                    console.print(f"[dim]启动阶段 {name}: {self._seconds(p)}[/dim]")
+
+# Process-wide timer; its origin is the first import, which main.py does before anything heavy
+startup = StartupTimer()
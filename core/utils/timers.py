@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from core.utils.notifications import notifications
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel: `levels` wheels of `slots` buckets, each level
+    `slots` times coarser than the one below. Adding and cancelling are O(1);
+    a bucket of a coarse level is re-spread into the finer levels when the
+    clock reaches it, so every tick touches one bucket per level at most.
+
+    Not thread-safe on its own; `TimerService` serializes access.
+    """
+
+    def __init__(self, slots: int = 64, levels: int = 4):
+        self.slots = slots
+        self.levels = levels
+        self.current = 0 # Ticks elapsed
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._where: dict = {} # key -> (level, slot, expires)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key) -> bool:
+        return key in self._where
+
+    def add(self, key, expires: int, payload=None):
+        """Schedules `key` to expire at tick `expires`, replacing an earlier entry with the same key."""
+        self.cancel(key)
+        # The current bucket has already been processed; the earliest possible expiry is the next tick
+        expires = max(expires, self.current + 1)
+        # Beyond the top level's span the entry parks in the farthest bucket and is rescheduled when it expires
+        expires = min(expires, self.current + self.slots ** self.levels - 1)
+        self._place(key, expires, payload)
+
+    def _place(self, key, expires: int, payload):
+        delta = expires - self.current
+        level = 0
+        while delta >= self.slots ** (level + 1):
+            level += 1
+        slot = (expires // self.slots ** level) % self.slots
+        self._wheels[level][slot][key] = (expires, payload)
+        self._where[key] = (level, slot, expires)
+
+    def cancel(self, key) -> bool:
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        level, slot, _ = where
+        del self._wheels[level][slot][key]
+        return True
+
+    def advance(self) -> list[tuple]:
+        """Moves the clock one tick; returns the (key, payload) pairs that expired."""
+        self.current += 1
+        for level in range(1, self.levels):
+            if self.current % self.slots ** level:
+                break
+            slot = (self.current // self.slots ** level) % self.slots
+            bucket, self._wheels[level][slot] = self._wheels[level][slot], {}
+            for key, (expires, payload) in bucket.items():
+                del self._where[key]
+                # May be due this very tick: the level-0 bucket below is processed after cascading
+                self._place(key, expires, payload)
+        slot = self.current % self.slots
+        bucket, self._wheels[0][slot] = self._wheels[0][slot], {}
+        for key in bucket:
+            del self._where[key]
+        return [(key, payload) for key, (_, payload) in bucket.items()]
+
+class TimerService:
+    """
+    Countdown timers of every session on one timer wheel, driven by `run()`
+    on the event loop. An expired timer is evicted, written to the owning
+    session's notification inbox (which wakes the agent), and dropped from
+    `<history_dir>/timers.json`, where pending timers survive restarts.
+    """
+
+    def __init__(self, tick_seconds: float = 0.5):
+        self.tick_seconds = tick_seconds
+        self._wheel = TimerWheel()
+        self._origin = time.time()
+        self._lock = threading.Lock()
+        self._timers: dict[tuple[str, str], dict] = {} # (session_id, name) -> timer
+        self._history_dirs: dict[str, str] = {}
+        self._wakeup = None # (loop, asyncio.Event) while run() is active
+
+    def _tick_of(self, deadline: float) -> int:
+        return int((deadline - self._origin) / self.tick_seconds + 0.999999)
+
+    def _poke(self):
+        if self._wakeup is not None:
+            loop, event = self._wakeup
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass # Loop already closed
+
+    def _save(self, session_id: str):
+        history_dir = self._history_dirs.get(session_id)
+        if history_dir is None:
+            return
+        pending = {name: timer for (sid, name), timer in self._timers.items() if sid == session_id}
+        path = os.path.join(history_dir, "timers.json")
+        try:
+            if not pending:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            os.makedirs(history_dir, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(pending, f, ensure_ascii=False, indent=2)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def _schedule(self, key: tuple[str, str], timer: dict):
+        if not len(self._wheel):
+            # The driver stops ticking while idle; catch the empty wheel up instead of replaying empty ticks
+            self._wheel.current = max(self._wheel.current, int((time.time() - self._origin) / self.tick_seconds))
+        self._timers[key] = timer
+        self._wheel.add(key, self._tick_of(timer["end_time"]))
+
+    def start(self, session, name: str, seconds: float) -> dict | None:
+        """Starts a timer; returns None if one with this name is already pending."""
+        key = (session.session_id, name)
+        now = time.time()
+        with self._lock:
+            if key in self._timers:
+                return None
+            self._history_dirs[session.session_id] = session.history_dir
+            timer = {"start_time": now, "end_time": now + seconds, "duration": seconds}
+            self._schedule(key, timer)
+            self._save(session.session_id)
+        self._poke()
+        return timer
+
+    def cancel(self, session, name: str) -> dict | None:
+        """Stops a pending timer; returns it, or None if there was none."""
+        key = (session.session_id, name)
+        with self._lock:
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                self._wheel.cancel(key)
+                self._save(session.session_id)
+        return timer
+
+    def pending(self, session) -> dict[str, dict]:
+        with self._lock:
+            return {name: dict(timer) for (sid, name), timer in self._timers.items() if sid == session.session_id}
+
+    def restore(self, session):
+        """Re-schedules the timers a previous run left in the session's timers.json."""
+        path = os.path.join(session.history_dir, "timers.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._history_dirs[session.session_id] = session.history_dir
+            for name, timer in saved.items():
+                # Timers that ran out while the program was closed fire on the next tick
+                self._schedule((session.session_id, name), timer)
+        self._poke()
+
+    def _fire(self, expired: list[tuple]) -> list[tuple[str, str, dict]]:
+        """Evicts expired timers (caller holds the lock); returns the ones that are really due."""
+        due = []
+        now = time.time()
+        for key, _ in expired:
+            timer = self._timers.get(key)
+            if timer is None:
+                continue
+            if timer["end_time"] - now > self.tick_seconds:
+                # Parked beyond the wheel's span: schedule the remainder
+                self._wheel.add(key, self._tick_of(timer["end_time"]))
+                continue
+            del self._timers[key]
+            due.append((*key, timer))
+        for session_id in {session_id for session_id, _, _ in due}:
+            self._save(session_id)
+        return due
+
+    async def run(self):
+        """Drives the wheel until cancelled; sleeps without ticking while no timer is pending."""
+        event = asyncio.Event()
+        self._wakeup = (asyncio.get_running_loop(), event)
+        try:
+            while True:
+                with self._lock:
+                    target = int((time.time() - self._origin) / self.tick_seconds)
+                    due = []
+                    while self._wheel.current < target:
+                        due += self._fire(self._wheel.advance())
+                    idle = not len(self._wheel)
+                for session_id, name, timer in due:
+                    late = time.time() - timer["end_time"]
+                    note = f"计时器 '{name}' 已到时（时长 {timer['duration']} 秒）"
+                    if late > 60:
+                        note += f"，实际晚了 {late:.0f} 秒（程序关闭期间到时）"
+                    notifications.post(session_id, note)
+                event.clear()
+                if idle:
+                    await event.wait()
+                else:
+                    next_tick = self._origin + (self._wheel.current + 1) * self.tick_seconds
+                    try:
+                        await asyncio.wait_for(event.wait(), max(0.0, next_tick - time.time()))
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._wakeup = None
+
+    @asynccontextmanager
+    async def running(self):
+        """Drives the timers in a background task for the duration of the block."""
+        driver = asyncio.create_task(self.run())
+        try:
+            yield self
+        finally:
+            driver.cancel()
+            await asyncio.gather(driver, return_exceptions=True)
+
+timers = TimerService()
@@ -0,0 +1,84 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+class CappedBuffer:
+    """Collects one tool call's stdout/stderr, keeping at most `limit` characters."""
+
+    def __init__(self, limit: int = 8000):
+        self.limit = limit
+        self.parts: list[str] = []
+        self.size = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            room = self.limit - self.size
+            if room > 0:
+                self.parts.append(text[:room])
+                self.size += min(len(text), room)
+            self.dropped += max(0, len(text) - room)
+        return len(text)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        return f"{text}\n...[输出过长，已截断 {self.dropped} 字符]" if self.dropped else text
+
+_tool_output: ContextVar[CappedBuffer | None] = ContextVar("tool_output", default=None)
+_tool_cancel: ContextVar[threading.Event | None] = ContextVar("tool_cancel", default=None)
+
+class _StreamRouter:
+    """
+    Stands in for sys.stdout/sys.stderr: writes made while a tool call is
+    running (in any thread, via the context) go to that call's buffer,
+    everything else to the real stream. Unlike redirect_stdout this is safe
+    with concurrent tool calls.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        buffer = _tool_output.get()
+        if buffer is None:
+            return self._stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        if _tool_output.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def install_output_router():
+    if not isinstance(sys.stdout, _StreamRouter):
+        sys.stdout = _StreamRouter(sys.stdout)
+    if not isinstance(sys.stderr, _StreamRouter):
+        sys.stderr = _StreamRouter(sys.stderr)
+
+@contextmanager
+def tool_call_context(buffer: CappedBuffer, cancel_event: threading.Event):
+    output_token = _tool_output.set(buffer)
+    cancel_token = _tool_cancel.set(cancel_event)
+    try:
+        yield
+    finally:
+        _tool_cancel.reset(cancel_token)
+        _tool_output.reset(output_token)
+
+def cancelled() -> bool:
+    """True once the running tool call timed out or its turn was cancelled; long-running tools should check it."""
+    event = _tool_cancel.get()
+    return event is not None and event.is_set()
+
+def sleep_unless_cancelled(seconds: float) -> bool:
+    """`time.sleep` that returns early (True) when the current tool call is cancelled."""
+    event = _tool_cancel.get()
+    if event is None:
+        time.sleep(seconds)
+        return False
+    return event.wait(seconds)
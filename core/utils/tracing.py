@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config_manage.manager import ConfigManager
+from core.utils.session import get_session
+from core.utils.http import read_request, write_response
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class Metrics:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._histograms: dict[tuple, list] = {} # key -> [bucket counts..., sum, count]
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.setdefault(key, [0] * len(DURATION_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": {f"{name}{dict(labels)}": value for (name, labels), value in self._counters.items()},
+                "histograms": {f"{name}{dict(labels)}": {"count": h[-1], "sum": h[-2]} for (name, labels), h in self._histograms.items()},
+            }
+
+    def render(self) -> str:
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (n, labels), value in self._counters.items():
+                    if n == name:
+                        lines.append(f"{name}{fmt(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (n, labels), hist in self._histograms.items():
+                    if n != name:
+                        continue
+                    for bound, count in zip(DURATION_BUCKETS, hist):
+                        lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {hist[-1]}")
+                    lines.append(f"{name}_sum{fmt(labels)} {hist[-2]}")
+                    lines.append(f"{name}_count{fmt(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+class Span:
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "wall_start", "duration", "status")
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, attrs: dict, parent: "Span | None"):
+        self.name, self.attrs = name, attrs
+        self.span_id = next(Span._ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else f"{os.getpid():x}-{self.span_id:x}"
+        self.start, self.wall_start = time.perf_counter(), time.time()
+        self.duration = None
+        self.status = "ok"
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": self.wall_start, "duration": self.duration,
+            "status": self.status, "attrs": self.attrs,
+        }
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+class _TraceWriter:
+    """Appends finished spans to the JSONL trace file when `tracing.enable` is set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._configured = False
+
+    def _configure(self):
+        config = ConfigManager("config.json")
+        if config.get("tracing.enable", False):
+            path = config.get("tracing.path", os.path.join("history", "trace.jsonl"))
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._configured = True
+
+    def write(self, span: Span):
+        with self._lock:
+            if not self._configured:
+                self._configure()
+            if self._file:
+                self._file.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+_writer = _TraceWriter()
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times a block as a child of the current span; works the same in sync and async code."""
+    parent = _current_span.get()
+    if parent is None:
+        attrs.setdefault("session", get_session().session_id)
+    current = Span(name, attrs, parent)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except asyncio.CancelledError:
+        current.status = "cancelled"
+        raise
+    except BaseException as e:
+        current.status = "error"
+        current.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current.start
+        metrics.observe("muli_span_duration_seconds", current.duration, span=name)
+        if current.status != "ok":
+            metrics.inc("muli_span_errors_total", span=name, status=current.status)
+        try:
+            _writer.write(current)
+        except Exception:
+            pass # Tracing must never break a turn
+
+def traced(name: str):
+    """Decorator form of `span` for plain and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9464) -> asyncio.Server:
+    """Serves `GET /metrics` in the Prometheus text format."""
+    async def handle(reader, writer):
+        try:
+            while (request := await read_request(reader)) is not None:
+                if request.path == "/metrics":
+                    await write_response(writer, 200, metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+                else:
+                    await write_response(writer, 404, {"error": "not found"})
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
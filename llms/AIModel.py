@@ -1,57 +1,187 @@
 import openai
+import copy
 from typing import Callable
 import asyncio
-from llms.providers import supported_providers, openai_get_text_response, deepseek_get_text_response
-
-import os
-import sys
-from contextlib import redirect_stdout, redirect_stderr
+import time
+from llms import providers
+from llms.providers import supported_providers
+from llms.scheduler import scheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from llms.token_ledger import TokenLedger
+from llms.cassette import wrap_client
+from llms.stream import ToolCallAssembler, consume_stream
+from llms.message import Message, to_wire
+from llms.response_cache import response_cache
+from core.utils.tracing import span, traced, metrics, current_span
 
 
 class AIModel:
     def __init__(self, api_key: str, base_url: str, model_name: str, provider_type: str, system_prompt: str, tools: None | list[dict] = None):
         self.api_key, self.base_url, self.model_name, self.provider_type, self.system_prompt, self.tools = api_key, base_url, model_name, provider_type, system_prompt, tools
-        self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
-        self.messages = [{"role": "system", "content": self.system_prompt}]
+        self.client = wrap_client(openai.OpenAI(api_key=self.api_key, base_url=self.base_url))
+        self.messages: list[Message] = [Message("system", self.system_prompt)]
+        # Reasoning of the current turn's assistant messages, sent back while the turn's tool loop runs
+        self.reasoning: dict[Message, str] = {}
+        self.token_ledger = TokenLedger(self.model_name)
+        self.session_id = "default" # Fairness key for the shared request scheduler
+        # Optional (tool_name, result) -> str hook applied before a tool result is displayed, logged or stored
+        self.result_processor: Callable[[str, str], str] | None = None
+        self.stream = False # Stream responses (enables speculative tool execution in chat_with_tools)
+        self.speculative_tools: set[str] = set() # Side-effect-free tools that may start before the message is complete
+
+    def fork(self, system_prompt: str, tools: None | list[dict] = None) -> "AIModel":
+        """A new conversation sharing this model's client, token ledger, scheduler session and tool hooks."""
+        child = copy.copy(self)
+        child.system_prompt = system_prompt
+        child.tools = tools
+        child.messages = [Message("system", system_prompt)]
+        child.reasoning = {}
+        child.logger = None # Sub-conversations stay out of the display log
+        return child
 
     def _clear_reasoning_content(self):
-        for message in self.messages:
-            if isinstance(message, dict):
-                if 'reasoning_content' in message:
-                    message['reasoning_content'] = None
-            elif hasattr(message, 'reasoning_content'):
-                message.reasoning_content = None
+        self.reasoning = {}
 
-    def chat(self, send: str | None, after_tool: bool = False) -> dict:
-        if not after_tool:
-            self._clear_reasoning_content()
-            self.messages.append({"role": "user", "content": send})
+    def _append_answer(self, ans):
+        if hasattr(ans, "model_dump"):
+            message, reasoning = Message.from_completion(ans)
+            if reasoning:
+                self.reasoning[message] = reasoning
+        else:
+            message = Message.from_dict(ans)
+        self.messages.append(message)
+
+    def _cache_lookup(self, site: str, messages: list, tools: None | list[dict]):
+        """(cache, key, cached answer) for call sites whose cache policy is on; (None, None, None) otherwise."""
+        cache = response_cache(site)
+        if cache is None:
+            return None, None, None
+        key = cache.key(provider=self.provider_type, model=self.model_name, messages=to_wire(messages, self.reasoning), tools=tools)
+        cached = cache.get(site, key)
+        if cached is None:
+            return cache, key, None
+        from openai.types.chat import ChatCompletionMessage
+        return cache, key, ChatCompletionMessage.model_validate_json(cached)
+
+    @staticmethod
+    def _cache_store(cache, key: str, site: str, ans):
+        if cache is not None and hasattr(ans, "model_dump_json"):
+            cache.put(site, key, ans.model_dump_json())
+
+    def _cached_text_response(self, messages: list, tools: None | list[dict], site: str):
+        cache, key, ans = self._cache_lookup(site, messages, tools)
+        if ans is None:
+            ans = self._get_text_response(messages, tools)
+            self._cache_store(cache, key, site, ans)
+        return ans
+
+    def _get_text_response(self, messages: list, tools: None | list[dict]):
+        messages = to_wire(messages, self.reasoning)
         if self.provider_type == "openai":
-            ans =  openai_get_text_response(self.messages, self.tools, self.client, self.model_name)
+            return providers.openai_get_text_response(messages, tools, self.client, self.model_name)
         elif self.provider_type == "deepseek":
-            ans =  deepseek_get_text_response(self.messages, self.tools, self.client, self.model_name)
-        else:
-            raise NotImplementedError(f"Provider type {self.provider_type} not supported yet. These providers are supported: {supported_providers}")
-        
-        self.messages.append(ans.model_dump() if hasattr(ans, "model_dump") else ans)
+            return providers.deepseek_get_text_response(messages, tools, self.client, self.model_name)
+        raise NotImplementedError(f"Provider type {self.provider_type} not supported yet. These providers are supported: {supported_providers}")
+
+    def _stream_text_response(self, messages: list, tools: None | list[dict]):
+        messages = to_wire(messages, self.reasoning)
+        if self.provider_type == "openai":
+            return providers.openai_stream_text_response(messages, tools, self.client, self.model_name)
+        elif self.provider_type == "deepseek":
+            return providers.deepseek_stream_text_response(messages, tools, self.client, self.model_name)
+        raise NotImplementedError(f"Provider type {self.provider_type} not supported yet. These providers are supported: {supported_providers}")
+
+    async def _astream_text_response(self, messages: list, tools: None | list[dict], on_tool_call: Callable[[dict], None] | None, on_delta: Callable[[str, str], None] | None = None):
+        assembler = ToolCallAssembler()
+        generate_span = current_span()
+        started = time.perf_counter()
+        first_chunk = True
+
+        def on_chunk(chunk):
+            nonlocal first_chunk
+            if first_chunk and generate_span is not None:
+                generate_span.set(first_chunk_seconds=time.perf_counter() - started)
+            first_chunk = False
+            if on_delta:
+                for choice in chunk.choices:
+                    if getattr(choice.delta, "reasoning_content", None):
+                        on_delta("reasoning", choice.delta.reasoning_content)
+                    if choice.delta.content:
+                        on_delta("content", choice.delta.content)
+            for call in assembler.feed(chunk):
+                if on_tool_call:
+                    on_tool_call(call)
+
+        await consume_stream(lambda: self._stream_text_response(messages, tools), on_chunk)
+        return assembler.message()
+
+    async def _aget_text_response(self, messages: list, tools: None | list[dict], priority: int, on_tool_call: Callable[[dict], None] | None = None, site: str = "chat", on_delta: Callable[[str, str], None] | None = None):
+        """
+        Waits for a rate-limit slot, then runs the blocking provider call off the event loop.
+        When streaming, `on_tool_call` receives each tool call as soon as its arguments are complete
+        and `on_delta` receives each ("content" | "reasoning", text) fragment as it arrives.
+        `site` selects the response cache policy; a cache hit skips the scheduler and the provider.
+        """
+        with span("llm.request", provider=self.provider_type, model=self.model_name, priority=priority) as request_span:
+            cache, key, cached = None, None, None
+            if response_cache(site) is not None:
+                # SQLite I/O stays off the event loop
+                cache, key, cached = await asyncio.to_thread(self._cache_lookup, site, messages, tools)
+            if cache is not None:
+                request_span.set(cache="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+            tokens = self.token_ledger.count_messages(messages)
+            request_span.set(prompt_tokens=tokens)
+            metrics.inc("muli_llm_requests_total", model=self.model_name)
+            metrics.inc("muli_llm_prompt_tokens_total", tokens, model=self.model_name)
+            with span("llm.queue"):
+                await scheduler.acquire(self.provider_type, self.model_name, tokens, session=self.session_id, priority=priority)
+            with span("llm.generate", stream=self.stream):
+                if self.stream:
+                    ans = await self._astream_text_response(messages, tools, on_tool_call, on_delta)
+                else:
+                    ans = await asyncio.to_thread(self._get_text_response, messages, tools)
+            if cache is not None:
+                await asyncio.to_thread(self._cache_store, cache, key, site, ans)
+            return ans
+
+    def _prepare_turn(self, send: str | None, after_tool: bool):
+        if not after_tool:
+            self._clear_reasoning_content()
+            self.messages.append(Message("user", send))
+
+    @traced("llm.chat")
+    def chat(self, send: str | None, after_tool: bool = False) -> dict:
+        self._prepare_turn(send, after_tool)
+        ans = self._cached_text_response(self.messages, self.tools, "chat")
+        self._append_answer(ans)
+        return ans
+
+    @traced("llm.chat")
+    async def achat(self, send: str | None, after_tool: bool = False, priority: int = PRIORITY_INTERACTIVE, on_tool_call: Callable[[dict], None] | None = None, use_tools: bool = True, on_delta: Callable[[str, str], None] | None = None) -> dict:
+        """Async `chat` that goes through the shared request scheduler."""
+        self._prepare_turn(send, after_tool)
+        ans = await self._aget_text_response(self.messages, self.tools if use_tools else None, priority, on_tool_call, on_delta=on_delta)
+        self._append_answer(ans)
         return ans
 
+    @traced("llm.generate_response")
     def generate_response(self, messages: list[dict], tools: list[dict] = None) -> str:
         """
         Generates a response for a given list of messages without updating the internal state.
         This is useful for summarization or other stateless operations.
         """
-        if self.provider_type == "openai":
-            ans = openai_get_text_response(messages, tools, self.client, self.model_name)
-        elif self.provider_type == "deepseek":
-            ans = deepseek_get_text_response(messages, tools, self.client, self.model_name)
-        else:
-            raise NotImplementedError(f"Provider type {self.provider_type} not supported yet.")
-            
+        ans = self._cached_text_response(messages, tools, "generate_response")
+        return ans.content if hasattr(ans, 'content') else str(ans)
+
+    @traced("llm.generate_response")
+    async def agenerate_response(self, messages: list[dict], tools: list[dict] = None, priority: int = PRIORITY_BACKGROUND) -> str:
+        """Async `generate_response`; defaults to background priority so interactive turns go first."""
+        ans = await self._aget_text_response(messages, tools, priority, site="generate_response")
         return ans.content if hasattr(ans, 'content') else str(ans)
     
     def add_tool_result(self, tool_call_id: str, content: str) -> None:
-        self.messages.append({"role": "tool", "tool_call_id": tool_call_id, "content": content})
+        self.messages.append(Message("tool", content, tool_call_id=tool_call_id))
 
     def _print_reasoning(self, ans, console):
         if console and hasattr(ans, 'reasoning_content') and ans.reasoning_content:
@@ -61,7 +191,9 @@ class AIModel:
         self,
         send: str,
         tool_executor: Callable[[str, str], str],
-        console = None
+        console = None,
+        event_handler: Callable[[str, dict], None] | None = None,
+        max_tool_rounds: int | None = None
     ) -> str:
         """
         带工具调用循环的聊天方法。
@@ -70,26 +202,65 @@ class AIModel:
             send: 用户消息
             tool_executor: 工具执行器函数，接收 (tool_name, arguments) 返回结果字符串
             console: rich console 对象，用于打印输出
+            event_handler: 可选的事件回调，接收 (event, data)，用于向客户端推送
+                reasoning / content / tool_call / tool_result 事件；流式输出时还会推送
+                reasoning_delta / content_delta 增量事件
+            max_tool_rounds: 可选的工具调用轮数上限，达到后要求模型不再调用工具直接作答
         
         Returns:
             最终的 AI 回复内容
         """
-        from rich.markdown import Markdown
-        
         if hasattr(self, 'logger') and self.logger and send:
             self.logger.log("user", send, "text")
 
-        ans = self.chat(send)
+        def emit(event: str, **data):
+            if event_handler:
+                event_handler(event, data)
+
+        def emit_delta(kind: str, text: str):
+            emit(f"{kind}_delta", text=text)
+
+        async def run_tool(tool_name: str, arguments: str):
+            # Tool output is captured per call by the executor, not redirected process-wide
+            if asyncio.iscoroutinefunction(tool_executor):
+                return await tool_executor(tool_name, arguments)
+            return tool_executor(tool_name, arguments)
+
+        # Side-effect-free tools start while the model is still streaming; the loop consumes their
+        # results in message order, and any the turn never reaches (error, cancellation) are discarded
+        speculative: dict[str, asyncio.Task] = {}
+
+        def start_speculative(call: dict):
+            if call["function"]["name"] in self.speculative_tools and call["id"] not in speculative:
+                speculative[call["id"]] = asyncio.create_task(run_tool(call["function"]["name"], call["function"]["arguments"]))
+                metrics.inc("muli_tool_speculative_total", tool=call["function"]["name"])
+
+        try:
+            return await self._chat_with_tools_loop(send, run_tool, speculative, start_speculative, console, emit, max_tool_rounds, emit_delta if event_handler else None)
+        finally:
+            for task in speculative.values():
+                task.cancel()
+
+    async def _chat_with_tools_loop(self, send, run_tool, speculative, start_speculative, console, emit, max_tool_rounds, on_delta=None) -> str:
+        from rich.markdown import Markdown
+
+        ans = await self.achat(send, on_tool_call=start_speculative, on_delta=on_delta)
         self._print_reasoning(ans, console)
+        if getattr(ans, "reasoning_content", None):
+            emit("reasoning", text=ans.reasoning_content)
 
         if ans.tool_calls and console and ans.content:
             console.print(Markdown(str(ans.content)))
             if hasattr(self, 'logger') and self.logger:
                 self.logger.log("assistant", ans.content, "markdown")
+        if ans.tool_calls and ans.content:
+            emit("content", text=ans.content)
 
         tool_color = "cyan dim" if self.model_name == "deepseek-reasoner" else "cyan"
 
+        rounds = 0
         while ans.tool_calls:
+            rounds += 1
             for tool_call in ans.tool_calls:
                 tool_call_id = tool_call.id
                 tool_name = tool_call.function.name
@@ -99,28 +270,35 @@ class AIModel:
                     console.print(f"[{tool_color}]<工具调用> {tool_name}: {arguments}[/{tool_color}]")
                 if hasattr(self, 'logger') and self.logger:
                     self.logger.log("tool_call", f"{tool_name}: {arguments}", "tool")
-                    
-                with open(os.devnull, 'w') as f:
-                    with redirect_stdout(f), redirect_stderr(f):
-                        # Check if tool_executor is async
-                        if asyncio.iscoroutinefunction(tool_executor):
-                             result = await tool_executor(tool_name, arguments)
-                        else:
-                             result = tool_executor(tool_name, arguments)
+                emit("tool_call", id=tool_call_id, name=tool_name, arguments=arguments)
+
+                if tool_call_id in speculative:
+                    result = await speculative.pop(tool_call_id)
+                else:
+                    result = await run_tool(tool_name, arguments)
+                if self.result_processor:
+                    result = self.result_processor(tool_name, str(result))
                 
                 if console:
                     console.print(f"[{tool_color}]<工具结果> {str(result).replace("\n", "")[:100]}{'...' if len(str(result)) > 100 else ''}[/{tool_color}]")
                 if hasattr(self, 'logger') and self.logger:
                     self.logger.log("tool_result", str(result), "tool")
+                emit("tool_result", id=tool_call_id, name=tool_name, result=str(result))
                 
                 self.add_tool_result(tool_call_id, result)
-            ans = self.chat(send=None, after_tool=True)
+            last_round = max_tool_rounds is not None and rounds >= max_tool_rounds
+            ans = await self.achat(send=None, after_tool=True, on_tool_call=start_speculative, use_tools=not last_round, on_delta=on_delta)
             self._print_reasoning(ans, console)
+            if getattr(ans, "reasoning_content", None):
+                emit("reasoning", text=ans.reasoning_content)
+            if ans.tool_calls and ans.content:
+                emit("content", text=ans.content)
         
         # Log final assistant response
         if ans.content: 
              if hasattr(self, 'logger') and self.logger:
                 self.logger.log("assistant", ans.content, "markdown")
+        emit("final", text=ans.content)
 
         return ans.content
     
\ No newline at end of file
@@ -1,5 +1,13 @@
 import openai
-from llms.providers import supported_providers, openai_get_structure_output, deepseek_get_structure_output
+import asyncio
+import json
+from pydantic import BaseModel
+from llms.scheduler import scheduler, PRIORITY_BATCH
+from llms.token_ledger import TokenLedger
+from llms.cassette import wrap_client
+from llms.response_cache import response_cache
+from llms import providers
+from llms.providers import supported_providers
 from config_manage.manager import ConfigManager
 
 class JsonModel:
@@ -7,13 +15,76 @@ class JsonModel:
         config = ConfigManager("config.json")
         self.provider_type = config.get("model_config.json_model.provider_type")
         self.model_name = config.get("model_config.json_model.model_name")
-        self.client = openai.OpenAI(api_key=config.get("model_config.json_model.api_key"), base_url=config.get("model_config.json_model.api_base_url"))
-    
+        self.max_concurrency = config.get("model_config.json_model.max_concurrency", 8)
+        api_key, base_url = config.get("model_config.json_model.api_key"), config.get("model_config.json_model.api_base_url")
+        self.client = wrap_client(openai.OpenAI(api_key=api_key, base_url=base_url))
+        self.async_client = wrap_client(openai.AsyncOpenAI(api_key=api_key, base_url=base_url))
+        self.token_ledger = TokenLedger(self.model_name or "")
+
+    def _cache_key(self, cache, messages: list[dict], text_format) -> str:
+        return cache.key(provider=self.provider_type, model=self.model_name, messages=messages, text_format=text_format.model_json_schema())
+
     def get_json(self, send: str, text_format) -> dict:
         messages = [{"role": "user", "content": send}]
+        cache = response_cache("get_json")
+        if cache is not None:
+            key = self._cache_key(cache, messages, text_format)
+            cached = cache.get("get_json", key)
+            if cached is not None:
+                # Same shape the provider returns: a parsed model (openai) or a dict (deepseek)
+                return text_format.model_validate_json(cached) if self.provider_type == "openai" else json.loads(cached)
+        result = self._get_json(messages, text_format)
+        if cache is not None:
+            cache.put("get_json", key, result.model_dump_json() if isinstance(result, BaseModel) else json.dumps(result, ensure_ascii=False))
+        return result
+
+    def _get_json(self, messages: list[dict], text_format):
         if self.provider_type == "openai":
-            return openai_get_structure_output(messages, text_format, self.client, self.model_name)
+            return providers.openai_get_structure_output(messages, text_format, self.client, self.model_name)
         elif self.provider_type == "deepseek":
-            return deepseek_get_structure_output(messages, text_format, self.client, self.model_name)
+            return providers.deepseek_get_structure_output(messages, text_format, self.client, self.model_name)
         raise NotImplementedError(f"Provider type {self.provider_type} not supported yet. These providers are supported: {supported_providers}")
-    
\ No newline at end of file
+
+    async def aget_json(self, send: str, text_format: type[BaseModel], priority: int = PRIORITY_BATCH) -> BaseModel:
+        """Async single extraction, validated through `text_format.model_validate_json`."""
+        messages = [{"role": "user", "content": send}]
+        cache = response_cache("get_json")
+        if cache is not None:
+            key = self._cache_key(cache, messages, text_format)
+            cached = await asyncio.to_thread(cache.get, "get_json", key)
+            if cached is not None:
+                return text_format.model_validate_json(cached)
+        await scheduler.acquire(self.provider_type, self.model_name, self.token_ledger.count_messages(messages), priority=priority)
+        result = await self._aget_json(messages, text_format)
+        if cache is not None:
+            await asyncio.to_thread(cache.put, "get_json", key, result.model_dump_json())
+        return result
+
+    async def _aget_json(self, messages: list[dict], text_format: type[BaseModel]) -> BaseModel:
+        if self.provider_type == "openai":
+            return await providers.openai_aget_structure_output(messages, text_format, self.async_client, self.model_name)
+        elif self.provider_type == "deepseek":
+            return await providers.deepseek_aget_structure_output(messages, text_format, self.async_client, self.model_name)
+        raise NotImplementedError(f"Provider type {self.provider_type} not supported yet. These providers are supported: {supported_providers}")
+
+    async def get_json_many(
+        self,
+        sends: list[str],
+        text_format: type[BaseModel],
+        max_concurrency: int | None = None,
+        return_exceptions: bool = False
+    ) -> list[BaseModel | BaseException]:
+        """
+        Runs many structured extractions concurrently.
+
+        At most `max_concurrency` requests (default `model_config.json_model.max_concurrency`)
+        are in flight at once. Results keep the order of `sends`; with `return_exceptions`
+        failed items are returned as exceptions instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def _one(send: str) -> BaseModel:
+            async with semaphore:
+                return await self.aget_json(send, text_format)
+
+        return await asyncio.gather(*(_one(send) for send in sends), return_exceptions=return_exceptions)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict, deque
+
+class CassetteMissError(KeyError):
+    pass
+
+def request_key(kwargs: dict) -> str:
+    """Stable hash of a chat completion request (model, messages, tools, parameters)."""
+    payload = {k: v for k, v in kwargs.items() if k not in ("timeout", "extra_headers")}
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class Cassette:
+    """
+    Record/replay store for provider exchanges, one JSON object per line.
+
+    In "record" mode every response is appended to the file; in "replay" mode
+    identical requests are answered from it in recorded order, without network access.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path, self.mode = path, mode
+        self._lock = threading.Lock()
+        self._tapes: dict[str, deque] = defaultdict(deque)
+        if mode == "replay":
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._tapes[entry["key"]].append(entry["response"])
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def play(self, key: str) -> dict:
+        with self._lock:
+            tape = self._tapes.get(key)
+            if not tape:
+                raise CassetteMissError(f"No recorded response for request {key[:12]} in {self.path}")
+            return tape.popleft()
+
+    def record(self, key: str, request: dict, response: dict):
+        line = json.dumps({"key": key, "request": request, "response": response}, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+class _Completions:
+    def __init__(self, completions, cassette: Cassette):
+        self._completions, self._cassette = completions, cassette
+
+    def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        key = request_key(kwargs)
+        if self._cassette.mode == "replay":
+            if kwargs.get("stream"):
+                return iter([ChatCompletionChunk.model_validate(chunk) for chunk in self._cassette.play(key)])
+            return ChatCompletion.model_validate(self._cassette.play(key))
+        response = self._completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, kwargs, response)
+        self._cassette.record(key, kwargs, response.model_dump())
+        return response
+
+    def _record_stream(self, key: str, kwargs: dict, stream):
+        # A streamed response is stored as its list of chunks once it has been read to the end
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk.model_dump())
+            yield chunk
+        self._cassette.record(key, kwargs, chunks)
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        key = request_key(kwargs)
+        if self._cassette.mode == "replay":
+            if kwargs.get("stream"):
+                return self._replay_stream([ChatCompletionChunk.model_validate(chunk) for chunk in self._cassette.play(key)])
+            return ChatCompletion.model_validate(self._cassette.play(key))
+        response = await self._completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, kwargs, response)
+        self._cassette.record(key, kwargs, response.model_dump())
+        return response
+
+    @staticmethod
+    async def _replay_stream(chunks: list):
+        for chunk in chunks:
+            yield chunk
+
+    async def _record_stream(self, key: str, kwargs: dict, stream):
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk.model_dump())
+            yield chunk
+        self._cassette.record(key, kwargs, chunks)
+
+class _Responses:
+    """Structured output (`responses.parse`); a replayed response is re-validated against `text_format`."""
+
+    def __init__(self, responses, cassette: Cassette):
+        self._responses, self._cassette = responses, cassette
+
+    @staticmethod
+    def _key(kwargs: dict) -> str:
+        return request_key({**kwargs, "text_format": kwargs["text_format"].model_json_schema()})
+
+    def _replay(self, key: str, kwargs: dict):
+        from openai.types.responses import ParsedResponse
+
+        return ParsedResponse[kwargs["text_format"]].model_validate(self._cassette.play(key))
+
+    def parse(self, **kwargs):
+        key = self._key(kwargs)
+        if self._cassette.mode == "replay":
+            return self._replay(key, kwargs)
+        response = self._responses.parse(**kwargs)
+        self._cassette.record(key, kwargs, response.model_dump())
+        return response
+
+class _AsyncResponses(_Responses):
+    async def parse(self, **kwargs):
+        key = self._key(kwargs)
+        if self._cassette.mode == "replay":
+            return self._replay(key, kwargs)
+        response = await self._responses.parse(**kwargs)
+        self._cassette.record(key, kwargs, response.model_dump())
+        return response
+
+class _Chat:
+    def __init__(self, chat, cassette: Cassette, asynchronous: bool = False):
+        self.completions = (_AsyncCompletions if asynchronous else _Completions)(chat.completions, cassette)
+
+class CassetteClient:
+    """
+    Wraps an `openai.OpenAI` or `openai.AsyncOpenAI` client so `chat.completions.create`
+    and `responses.parse` go through a cassette.
+    """
+
+    def __init__(self, client, cassette: Cassette, asynchronous: bool = False):
+        self._client = client
+        self.cassette = cassette
+        self.chat = _Chat(client.chat, cassette, asynchronous)
+        self.responses = (_AsyncResponses if asynchronous else _Responses)(client.responses, cassette)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+_cassettes: dict[str, Cassette] = {}
+
+def wrap_client(client):
+    """Applies the cassette configured by MULI_CASSETTE / MULI_CASSETTE_MODE, if any."""
+    path = os.environ.get("MULI_CASSETTE")
+    if not path:
+        return client
+    # Every model in the process shares one cassette per file
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path, os.environ.get("MULI_CASSETTE_MODE", "replay"))
+    import openai
+    return CassetteClient(client, _cassettes[path], asynchronous=isinstance(client, openai.AsyncOpenAI))
@@ -0,0 +1,62 @@
+import sys
+
+class Message:
+    """
+    One conversation message, holding only the fields the providers read.
+
+    Roles are interned, tool calls are kept as `(id, name, arguments)` tuples
+    and the wire dict is only built when a request is sent or the history is
+    saved. Reasoning text is not stored here: `AIModel` keeps the current
+    turn's reasoning in a side table so a new turn drops all of it at once.
+    Treat instances as immutable.
+    """
+    __slots__ = ("role", "content", "tool_calls", "tool_call_id")
+
+    def __init__(self, role: str, content: str | None = None, tool_calls: tuple = (), tool_call_id: str | None = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tool_calls = tool_calls
+        self.tool_call_id = tool_call_id
+
+    def __repr__(self) -> str:
+        return f"Message({self.role!r}, {self.content!r}, tool_calls={len(self.tool_calls)})"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Message":
+        """From the wire format; unknown fields (e.g. an old `model_dump()` history) are ignored."""
+        return cls(
+            data.get("role", "user"),
+            data.get("content"),
+            tuple(
+                (call.get("id"), call.get("function", {}).get("name"), call.get("function", {}).get("arguments"))
+                for call in data.get("tool_calls") or ()
+            ),
+            data.get("tool_call_id")
+        )
+
+    @classmethod
+    def from_completion(cls, message) -> tuple["Message", str | None]:
+        """Splits a provider's `ChatCompletionMessage` into a compact message and its reasoning text."""
+        return cls(
+            message.role or "assistant",
+            message.content,
+            tuple((call.id, call.function.name, call.function.arguments) for call in message.tool_calls or ())
+        ), getattr(message, "reasoning_content", None)
+
+    def to_wire(self, reasoning: str | None = None) -> dict:
+        wire = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            wire["tool_calls"] = [
+                {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+                for call_id, name, arguments in self.tool_calls
+            ]
+        if self.tool_call_id is not None:
+            wire["tool_call_id"] = self.tool_call_id
+        if reasoning is not None:
+            wire["reasoning_content"] = reasoning
+        return wire
+
+def to_wire(messages: list, reasoning: dict | None = None) -> list[dict]:
+    """Request payload for `messages`, which may mix `Message`s and ready-made wire dicts."""
+    reasoning = reasoning or {}
+    return [m.to_wire(reasoning.get(m)) if isinstance(m, Message) else m for m in messages]
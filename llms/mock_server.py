@@ -0,0 +1,143 @@
+"""
+Deterministic local OpenAI-compatible mock server.
+
+    python -m llms.mock_server --port 8900 --script script.json --latency 0.2
+
+Point a model at it with provider_type "openai" (or "deepseek") and
+api_base_url "http://127.0.0.1:8900/v1". The script is a JSON list of steps
+served in order, each like:
+
+    {"content": "...", "reasoning_content": "...", "latency": 0.5,
+     "tool_calls": [{"name": "get_current_time", "arguments": {}}]}
+
+Once the script is exhausted the server echoes the last user message
+(or starts over with --loop).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from core.utils.http import read_request, write_response, start_sse, write_sse
+
+class MockLLM:
+    def __init__(self, script: list[dict] | None = None, latency: float = 0.0, token_latency: float = 0.0, chunk_size: int = 8, loop: bool = False):
+        self.script = list(script or [])
+        self.loop = loop
+        self.latency = latency
+        self.token_latency = token_latency
+        self.chunk_size = chunk_size
+        self.step = 0
+        self.ids = itertools.count(1)
+
+    def next_step(self, body: dict) -> dict:
+        if self.loop and self.script and self.step >= len(self.script):
+            self.step = 0
+        if self.step < len(self.script):
+            step = self.script[self.step]
+            self.step += 1
+            return step
+        last_user = next((m.get("content") for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+        return {"content": f"mock: {last_user}"}
+
+    def _message(self, step: dict) -> dict:
+        message = {"role": "assistant", "content": step.get("content")}
+        if step.get("reasoning_content"):
+            message["reasoning_content"] = step["reasoning_content"]
+        if step.get("tool_calls"):
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{next(self.ids)}",
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}), ensure_ascii=False)}
+                }
+                for call in step["tool_calls"]
+            ]
+        return message
+
+    def completion(self, body: dict, step: dict) -> dict:
+        message = self._message(step)
+        return {
+            "id": f"chatcmpl-mock-{next(self.ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    def chunks(self, body: dict, step: dict):
+        """Yields `chat.completion.chunk` payloads for a streamed response."""
+        message = self._message(step)
+        base = {"id": f"chatcmpl-mock-{next(self.ids)}", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model", "mock")}
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        yield chunk({"role": "assistant", "content": ""})
+        for key in ("reasoning_content", "content"):
+            text = message.get(key) or ""
+            for i in range(0, len(text), self.chunk_size):
+                yield chunk({key: text[i:i + self.chunk_size]})
+        for index, call in enumerate(message.get("tool_calls", [])):
+            yield chunk({"tool_calls": [{"index": index, "id": call["id"], "type": "function", "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            arguments = call["function"]["arguments"]
+            for i in range(0, len(arguments), self.chunk_size):
+                yield chunk({"tool_calls": [{"index": index, "function": {"arguments": arguments[i:i + self.chunk_size]}}]})
+        yield chunk({}, "tool_calls" if message.get("tool_calls") else "stop")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while (request := await read_request(reader)) is not None:
+                if not request.path.endswith("/chat/completions") or request.method != "POST":
+                    await write_response(writer, 404, {"error": {"message": "not found"}})
+                    continue
+                body = request.json()
+                step = self.next_step(body)
+                await asyncio.sleep(step.get("latency", self.latency))
+                if not body.get("stream"):
+                    await write_response(writer, 200, self.completion(body, step))
+                    continue
+                await start_sse(writer)
+                for payload in self.chunks(body, step):
+                    await write_sse(writer, None, payload)
+                    if self.token_latency:
+                        await asyncio.sleep(self.token_latency)
+                await write_sse(writer, None, "[DONE]")
+                break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(mock: MockLLM, host: str = "127.0.0.1", port: int = 8900) -> asyncio.Server:
+    return await asyncio.start_server(mock.handle, host, port)
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--script", help="JSON file with the list of scripted responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte of every response")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--loop", action="store_true", help="restart the script instead of echoing once it is exhausted")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    async def run():
+        server = await serve(MockLLM(script, args.latency, args.token_latency, loop=args.loop), args.host, args.port)
+        print(f"Mock LLM server listening on http://{args.host}:{args.port}/v1")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,25 @@
-from llms.providers.openai import get_text_response as openai_get_text_response, get_structure_output as openai_get_structure_output
-from llms.providers.deepseek import get_text_response as deepseek_get_text_response, get_structure_output as deepseek_get_structure_output
+import importlib
 
-__all__ = [
-    "openai_get_text_response",
-    "openai_get_structure_output",
-    "deepseek_get_text_response",
-    "deepseek_get_structure_output",
-]
+# Provider functions are resolved on first access (PEP 562), so only the provider in use is imported
+_LAZY_ATTRS = {
+    "openai_get_text_response": ("llms.providers.openai", "get_text_response"),
+    "openai_stream_text_response": ("llms.providers.openai", "stream_text_response"),
+    "openai_get_structure_output": ("llms.providers.openai", "get_structure_output"),
+    "openai_aget_structure_output": ("llms.providers.openai", "aget_structure_output"),
+    "deepseek_get_text_response": ("llms.providers.deepseek", "get_text_response"),
+    "deepseek_stream_text_response": ("llms.providers.deepseek", "stream_text_response"),
+    "deepseek_get_structure_output": ("llms.providers.deepseek", "get_structure_output"),
+    "deepseek_aget_structure_output": ("llms.providers.deepseek", "aget_structure_output"),
+}
+
+__all__ = list(_LAZY_ATTRS)
 
 supported_providers = ["openai", "deepseek"]
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_ATTRS[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
@@ -1,4 +1,5 @@
 import json
+from functools import lru_cache
 from pydantic import BaseModel
 import textwrap
 
@@ -23,10 +24,25 @@ def get_text_response(messages: list[dict], tools: None | list[dict], client, mo
 
         return completion.choices[0].message
 
-def get_structure_output(messages: list[dict], text_format: BaseModel, client, model_name) -> dict:
-    json_schema_dict = text_format.model_json_schema()
-    json_schema = json.dumps(json_schema_dict, indent=4, ensure_ascii=False)
-    schema_prompt_appendix = textwrap.dedent(f"""
+def stream_text_response(messages: list[dict], tools: None | list[dict], client, model_name):
+    """Same request as `get_text_response`, returned as a stream of `chat.completion.chunk`s."""
+    kwargs = {}
+    if tools:
+        kwargs["tools"] = tools
+        if model_name == "deepseek-reasoner":
+            kwargs["extra_body"] = {"thinking": {"type": "enabled"}}
+    return client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        stream=True,
+        **kwargs
+    )
+
+@lru_cache(maxsize=128)
+def _schema_prompt_appendix(text_format: type[BaseModel]) -> str:
+    """Serializes the JSON Schema prompt once per Pydantic model."""
+    json_schema = json.dumps(text_format.model_json_schema(), ensure_ascii=False)
+    return textwrap.dedent(f"""
 
     --- 结构化输出指令 ---
     请根据以上内容，严格遵循下面提供的 JSON Schema，
@@ -37,13 +53,29 @@ def get_structure_output(messages: list[dict], text_format: BaseModel, client, m
     {json_schema}
     --- JSON SCHEMA END ---
     """)
-    messages[len(messages) - 1]["content"] += schema_prompt_appendix
+
+def _with_schema(messages: list[dict], text_format: type[BaseModel]) -> list[dict]:
+    # Copy the last message instead of mutating the caller's list
+    last = dict(messages[-1])
+    last["content"] = (last.get("content") or "") + _schema_prompt_appendix(text_format)
+    return messages[:-1] + [last]
+
+def get_structure_output(messages: list[dict], text_format: BaseModel, client, model_name) -> dict:
     response = client.chat.completions.create(
     model=model_name,
-    messages=messages,
+    messages=_with_schema(messages, text_format),
     response_format={
         'type': 'json_object'
         }
     )
 
     return json.loads(response.choices[0].message.content)
+
+async def aget_structure_output(messages: list[dict], text_format: type[BaseModel], client, model_name) -> BaseModel:
+    response = await client.chat.completions.create(
+        model=model_name,
+        messages=_with_schema(messages, text_format),
+        response_format={'type': 'json_object'}
+    )
+
+    return text_format.model_validate_json(response.choices[0].message.content)
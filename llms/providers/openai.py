@@ -16,6 +16,17 @@ def get_text_response(messages: list[dict], tools: None | list[dict], client, mo
 
         return completion.choices[0].message
 
+def stream_text_response(messages: list[dict], tools: None | list[dict], client, model_name):
+    """Same request as `get_text_response`, returned as a stream of `chat.completion.chunk`s."""
+    kwargs = {"tools": tools} if tools else {}
+    return client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        stream=True,
+        timeout=600,
+        **kwargs
+    )
+
 def get_structure_output(messages: list[dict], text_format, client, model_name) -> dict:
     response = client.responses.parse(
         model=model_name,
@@ -25,3 +36,13 @@ def get_structure_output(messages: list[dict], text_format, client, model_name)
     )
 
     return response.output_parsed
+
+async def aget_structure_output(messages: list[dict], text_format, client, model_name):
+    response = await client.responses.parse(
+        model=model_name,
+        input=messages,
+        text_format=text_format,
+        timeout=600
+    )
+
+    return text_format.model_validate_json(response.output_text)
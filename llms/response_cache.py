@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from config_manage.manager import ConfigManager
+from llms.cassette import request_key
+from core.utils.tracing import metrics
+
+# Call sites cached by default once the cache is enabled; interactive chat is off because
+# a conversation rarely repeats exactly and a cached answer would skip its tool calls' side effects
+DEFAULT_SITES = {"generate_response": True, "get_json": True, "chat": False}
+
+class ResponseCache:
+    """
+    On-disk LLM response cache in SQLite. Calls block on disk I/O, so async
+    callers run them through `asyncio.to_thread`.
+
+    Keys are `request_key` hashes of the request (model, messages, tools,
+    parameters); values are the serialized responses. Every hit refreshes the
+    entry's access time, and once `max_entries` or `max_bytes` is exceeded the
+    least recently used entries are evicted. Entries older than `ttl` seconds
+    (if set) count as misses.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_bytes: int = 200 * 1024 * 1024, ttl: float | None = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, site TEXT, value TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    @staticmethod
+    def key(**request) -> str:
+        return request_key(request)
+
+    def get(self, site: str, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is not None:
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            counter = self.hits if row is not None else self.misses
+            counter[site] = counter.get(site, 0) + 1
+        metrics.inc("muli_llm_cache_total", site=site, result="hit" if row is not None else "miss")
+        return row[0] if row is not None else None
+
+    def put(self, site: str, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, site, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, site, value, size, now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk from the least recently used end until both limits hold
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total, "hits": dict(self.hits), "misses": dict(self.misses)}
+
+_cache: ResponseCache | None = None
+_sites: dict[str, bool] = {}
+_loaded = False
+_load_lock = threading.Lock()
+
+def response_cache(site: str) -> ResponseCache | None:
+    """The shared cache if `llm_cache.enable` is set and the call site's policy allows it, else None."""
+    global _cache, _sites, _loaded
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                config = ConfigManager("config.json")
+                if config.get("llm_cache.enable", False):
+                    ttl = config.get("llm_cache.ttl_seconds", 0)
+                    _cache = ResponseCache(
+                        config.get("llm_cache.path", os.path.join("history", "llm_cache.sqlite3")),
+                        max_entries=config.get("llm_cache.max_entries", 5000),
+                        max_bytes=config.get("llm_cache.max_mb", 200) * 1024 * 1024,
+                        ttl=ttl or None
+                    )
+                    _sites = {**DEFAULT_SITES, **(config.get("llm_cache.sites", {}) or {})}
+                _loaded = True
+    if _cache is None or not _sites.get(site, False):
+        return None
+    return _cache
+
+def shared_cache() -> ResponseCache | None:
+    """The shared cache regardless of call site, for stats."""
+    response_cache("")
+    return _cache
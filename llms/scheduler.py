@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import time
+from config_manage.manager import ConfigManager
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 5
+PRIORITY_BACKGROUND = 10
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be consumed (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+class _ModelLimiter:
+    """Request/token buckets and a fair waiting queue for one (provider, model)."""
+
+    def __init__(self, rpm: float | None, tpm: float | None):
+        self.requests = TokenBucket(rpm, rpm) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm) if tpm else None
+        self.queue = []  # (priority, virtual_start, seq, future, tokens)
+        self.virtual_time = 0
+        self.session_finish = {}
+        self.pump = None
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def wait_time(self, tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1) if self.requests else 0.0,
+            self.tokens.wait_time(tokens) if self.tokens else 0.0,
+        )
+
+    def consume(self, tokens: int):
+        if self.requests:
+            self.requests.consume(1)
+        if self.tokens:
+            self.tokens.consume(tokens)
+
+class RequestScheduler:
+    """
+    Shared token-bucket scheduler for LLM requests, keyed by (provider, model).
+
+    Limits come from `model_config.rate_limits.<provider>.<model>` ({"rpm": ..., "tpm": ...}).
+    Within a priority level, waiting requests are ordered by start-time fair queuing over
+    sessions, so one busy session cannot starve the others.
+    """
+
+    def __init__(self, config_path: str = "config.json"):
+        self.config_path = config_path
+        self._limiters: dict[tuple[str, str], _ModelLimiter] = {}
+        self._seq = itertools.count()
+
+    def _limiter(self, provider: str, model: str) -> _ModelLimiter:
+        key = (provider, model)
+        if key not in self._limiters:
+            # Model names may contain dots, so index the dict instead of using a dotted path
+            limits = ConfigManager(self.config_path).get("model_config.rate_limits", {}) or {}
+            spec = (limits.get(provider) or {}).get(model) or (limits.get(provider) or {}).get("*") or {}
+            self._limiters[key] = _ModelLimiter(spec.get("rpm"), spec.get("tpm"))
+        return self._limiters[key]
+
+    async def acquire(self, provider: str, model: str, tokens: int, session: str = "default", priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Waits until the request may be sent. Returns the time spent queued."""
+        limiter = self._limiter(provider, model)
+        start = time.monotonic()
+        # Start-time fair queuing: each request's tag continues from its session's previous one
+        virtual_start = max(limiter.virtual_time, limiter.session_finish.get(session, 0))
+        limiter.session_finish[session] = virtual_start + 1
+        if not limiter.queue and limiter.wait_time(tokens) == 0:
+            limiter.consume(tokens)
+            self._grant(limiter, virtual_start)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(limiter.queue, (priority, virtual_start, next(self._seq), future, tokens))
+        if limiter.pump is None or limiter.pump.done():
+            limiter.pump = asyncio.create_task(self._pump(limiter))
+        await future
+        waited = time.monotonic() - start
+        limiter.total_wait += waited
+        limiter.max_wait = max(limiter.max_wait, waited)
+        return waited
+
+    def _grant(self, limiter: _ModelLimiter, virtual_start: int):
+        limiter.virtual_time = max(limiter.virtual_time, virtual_start)
+        limiter.granted += 1
+
+    async def _pump(self, limiter: _ModelLimiter):
+        while limiter.queue:
+            priority, virtual_start, _, future, tokens = limiter.queue[0]
+            if future.done(): # cancelled by the caller
+                heapq.heappop(limiter.queue)
+                continue
+            delay = limiter.wait_time(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(limiter.queue)
+            limiter.consume(tokens)
+            self._grant(limiter, virtual_start)
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        """Queue depth and wait times per `provider/model`."""
+        return {
+            f"{provider}/{model}": {
+                "queued": sum(1 for entry in limiter.queue if not entry[3].done()),
+                "granted": limiter.granted,
+                "avg_wait_seconds": limiter.total_wait / limiter.granted if limiter.granted else 0.0,
+                "max_wait_seconds": limiter.max_wait,
+            }
+            for (provider, model), limiter in self._limiters.items()
+        }
+
+scheduler = RequestScheduler()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from typing import Callable
+
+class ToolCallAssembler:
+    """
+    Rebuilds an assistant message from `chat.completion.chunk` deltas.
+
+    `feed` reports each tool call as soon as its `function.arguments` form a
+    complete JSON object, while later tool calls or content may still be
+    streaming, so the caller can start side-effect-free tools early.
+    """
+
+    def __init__(self):
+        self.content: list[str] = []
+        self.reasoning: list[str] = []
+        self.calls: dict[int, dict] = {}
+        self._reported: set[int] = set()
+        self.finish_reason = None
+
+    def _ready(self, index: int) -> dict | None:
+        call = self.calls[index]
+        if index in self._reported or not call["id"] or not call["function"]["name"]:
+            return None
+        try:
+            if not isinstance(json.loads(call["function"]["arguments"]), dict):
+                return None
+        except json.JSONDecodeError:
+            return None
+        self._reported.add(index)
+        return call
+
+    def feed(self, chunk) -> list[dict]:
+        """Adds one chunk; returns the tool calls that just became complete."""
+        completed = []
+        for choice in chunk.choices:
+            delta = choice.delta
+            if getattr(delta, "reasoning_content", None):
+                self.reasoning.append(delta.reasoning_content)
+            if delta.content:
+                self.content.append(delta.content)
+            for part in delta.tool_calls or []:
+                call = self.calls.setdefault(part.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+                if part.id:
+                    call["id"] = part.id
+                if part.function is not None:
+                    call["function"]["name"] += part.function.name or ""
+                    call["function"]["arguments"] += part.function.arguments or ""
+                if (ready := self._ready(part.index)) is not None:
+                    completed.append(ready)
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+        return completed
+
+    def message(self):
+        """The assembled message, shaped exactly like a non-streamed `choices[0].message`."""
+        from openai.types.chat import ChatCompletionMessage
+
+        message = {"role": "assistant", "content": "".join(self.content) or None}
+        if self.calls:
+            message["tool_calls"] = [self.calls[index] for index in sorted(self.calls)]
+        if self.reasoning:
+            message["reasoning_content"] = "".join(self.reasoning)
+        return ChatCompletionMessage.model_validate(message)
+
+_DONE = object()
+
+async def consume_stream(open_stream: Callable, on_chunk: Callable):
+    """
+    Iterates a blocking provider stream in a worker thread and hands each
+    chunk to `on_chunk` on the event loop. When the awaiting task is
+    cancelled the worker stops at the next chunk and closes the stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass # Loop already closed
+
+    def pump():
+        stream = None
+        try:
+            stream = open_stream()
+            for chunk in stream:
+                if stop.is_set():
+                    return
+                put((chunk, None))
+            put((_DONE, None))
+        except BaseException as e:
+            put((None, e))
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    worker = asyncio.ensure_future(asyncio.to_thread(pump))
+    try:
+        while True:
+            chunk, error = await queue.get()
+            if error is not None:
+                raise error
+            if chunk is _DONE:
+                break
+            on_chunk(chunk)
+    finally:
+        stop.set()
+        if worker.done():
+            worker.result()
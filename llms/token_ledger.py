@@ -0,0 +1,51 @@
+from functools import lru_cache
+import tiktoken
+from llms.message import Message
+
+class TokenLedger:
+    """Counts message tokens with a per-string cache, so unchanged history is never re-encoded."""
+
+    def __init__(self, model_name: str, cache_size: int = 8192):
+        self.model_name = model_name
+        self._encoding = None
+        self.count_text = lru_cache(maxsize=cache_size)(self._count_text)
+
+    @property
+    def encoding(self):
+        # Loading the BPE ranks takes a noticeable moment, so it is deferred until first use
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model_name)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+
+    def warm(self):
+        """Loads the encoding ahead of time, e.g. in a background thread while waiting for input."""
+        return self.encoding
+
+    def _count_text(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count_messages(self, messages: list) -> int:
+        num_tokens = 0
+        for message in messages:
+            num_tokens += 4  # every message follows <im_start>{role/name}\n{content}<im_end>\n
+            if isinstance(message, Message):
+                num_tokens += self.count_text(message.role)
+                if isinstance(message.content, str):
+                    num_tokens += self.count_text(message.content)
+                if message.tool_call_id:
+                    num_tokens += self.count_text(message.tool_call_id)
+                if message.tool_calls: # For tool calls etc
+                    num_tokens += self.count_text(str(message.tool_calls))
+                continue
+            for key, value in message.items():
+                if key == "reasoning_content":
+                    continue
+                if isinstance(value, str):
+                    num_tokens += self.count_text(value)
+                elif isinstance(value, list): # For tool calls etc
+                    num_tokens += self.count_text(str(value))
+        num_tokens += 2  # every reply is primed with <im_start>assistant
+        return num_tokens
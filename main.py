@@ -1,27 +1,98 @@
+from core.utils.startup import startup
 from rich.console import Console
 console = Console()
 console.print("[green]正在加载工具，请稍候...[/green]")
 
-from rich.markdown import Markdown
-from core.agents.MuLi import MuLi
-from core.tools.mcp_tools.mcp_tools import mcp_client
+with startup.phase("imports"):
+    from rich.markdown import Markdown
+    from core.agents.MuLi import MuLi
+    from core.tools.mcp_tools.mcp_tools import mcp_client
+    from core.utils.tracing import start_metrics_server
+    from core.utils.profiler import TurnProfiler
+    from core.utils.notifications import notifications
+    from core.utils.timers import timers
 import asyncio
 import os
 import shutil
+import signal
+import time
+
+WARM_PHASE = "encoding load (background)"
+
+def _warm_encoding(ml):
+    start = time.perf_counter()
+    ml.ai.token_ledger.warm()
+    startup.record(WARM_PHASE, time.perf_counter() - start)
+
+def _on_interrupt(callback) -> bool:
+    """Routes Ctrl+C to `callback` instead of KeyboardInterrupt; False where the loop cannot (Windows)."""
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGINT, callback)
+        return True
+    except (NotImplementedError, RuntimeError):
+        return False
 
 async def main():
-    ml = MuLi(console=console)
+    with startup.phase("agent init"):
+        ml = MuLi(console=console, history_dir=os.environ.get("MULI_HISTORY_DIR", "history"))
     console.print("[green]加载完成！[/green]")
+    startup.pending(WARM_PHASE)
+    startup.report(console, budget=ml.config.get("startup.budget_seconds"))
 
-    # Use persistent MCP client context
-    async with mcp_client:
+    # The tokenizer is only needed after the first reply, so load it while the user is typing;
+    # the report lists it as pending and is refreshed once it is done
+    warm_encoding = asyncio.create_task(asyncio.to_thread(_warm_encoding, ml))
+    warm_encoding.add_done_callback(lambda _: startup.report_background(console, WARM_PHASE))
+
+    profiler = TurnProfiler(out_dir=os.path.join(ml.history_dir, "profile"))
+    profiler.enabled = os.environ.get("MULI_PROFILE", "") not in ("", "0")
+
+    metrics_port = ml.config.get("tracing.metrics_port")
+    if metrics_port:
+        await start_metrics_server(ml.config.get("tracing.metrics_host", "127.0.0.1"), metrics_port)
+
+    async def run_turn(text: str):
+        profiler.start_turn()
+        turn = asyncio.create_task(ml.chat(text))
+        interruptible = _on_interrupt(turn.cancel)
+        try:
+            response = await turn
+            console.print(Markdown(response))
+        except asyncio.CancelledError:
+            if not turn.cancelled():
+                raise
+            # Only the turn is cancelled: MCP sessions and shells stay up for the next one
+            console.print("[yellow]已中断本轮对话[/yellow]")
+        finally:
+            if interruptible:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGINT)
+            profile_path = profiler.end_turn()
+        if profile_path:
+            console.print(f"[dim]本轮采样已写入 {profile_path}[/dim]")
+
+    # Use persistent MCP client context; the timer driver fires the time tool's
+    # countdown timers into the notification inbox while the REPL runs
+    async with mcp_client, timers.running():
+        pending_input = None
         while True:
             # Use to_thread to avoid blocking the event loop with input(), 
             # allowing background tasks (like MCP keepalives) to run.
+            if pending_input is None:
+                pending_input = asyncio.ensure_future(asyncio.to_thread(input, "> "))
+            # A finished background job or timer wakes the agent even while the user is not typing
+            notified = asyncio.ensure_future(notifications.wait(ml.session.session_id))
+            await asyncio.wait({pending_input, notified}, return_when=asyncio.FIRST_COMPLETED)
+            notified.cancel()
+            if not pending_input.done():
+                console.print("\n[dim]收到系统通知[/dim]")
+                await run_turn("")
+                continue
             try:
-                user_input = await asyncio.to_thread(input, "> ")
+                user_input = pending_input.result()
             except EOFError:
                 break
+            finally:
+                pending_input = None
 
             # Command handling
             if user_input.startswith("/"):
@@ -39,13 +110,54 @@ async def main():
                     except Exception as e:
                         console.print(f"[red]清空历史失败: {e}[/red]")
                     break # Exit after clearing history as per requirement
+                elif command.startswith("/profile"):
+                    action = command[len("/profile"):].strip()
+                    if action == "on":
+                        profiler.enabled = True
+                        console.print("[green]性能分析已开启，每轮对话的采样将写入火焰图文件[/green]")
+                    elif action == "off":
+                        profiler.enabled = False
+                        console.print("[yellow]性能分析已关闭[/yellow]")
+                    elif action == "dump":
+                        profiler.dump(console)
+                    else:
+                        console.print("[red]用法: /profile on|off|dump[/red]")
+                    continue
+                elif command.startswith("/history"):
+                    arg = command[len("/history"):].strip()
+                    if arg and not arg.isdigit():
+                        console.print("[red]用法: /history [页码][/red]")
+                    else:
+                        ml.show_history_page(int(arg) if arg else 1)
+                    continue
+                elif command == "/mcp":
+                    from rich.table import Table
+                    table = Table(title="MCP 服务器状态")
+                    for column in ("服务器", "状态", "调用", "错误", "超时", "重连", "P50", "P95", "最近错误"):
+                        table.add_column(column)
+                    for name, s in mcp_client.stats().items():
+                        table.add_row(
+                            name, s["state"], str(s["calls"]), str(s["errors"]), str(s["timeouts"]), str(s["reconnects"]),
+                            f"{s['latency_p50'] * 1000:.0f} ms" if s["latency_p50"] is not None else "-",
+                            f"{s['latency_p95'] * 1000:.0f} ms" if s["latency_p95"] is not None else "-",
+                            s["last_error"] or ""
+                        )
+                    console.print(table)
+                    continue
                 elif command == "/help":
                     help_text = """
 # 可用命令
 
 - `/exit` : 退出程序
 - `/clear-history` : 清空聊天记录并退出
+- `/profile on|off|dump` : 开启/关闭每轮对话的采样性能分析，或打印热点函数表（也可设置环境变量 `MULI_PROFILE=1`）
+- `/history [页码]` : 分页查看更早的对话记录（第 1 页为最近，启动时只回放最近 `history.replay_tail` 条）
+- `/mcp` : 查看各 MCP 服务器的连接状态、调用次数、错误与延迟
 - `/help` : 显示此帮助信息
+
+shell 后台任务（`submit_shell_job`）结束或计时器到时时，即使你没有输入，沐璃也会收到通知并自动回复一轮。
+
+对话进行中按 `Ctrl+C` 只会中断本轮对话（模型请求、工具调用与等待中的 shell 输出），对话历史回到本轮开始前，MCP 连接与 shell 会话保持不变。
 """
                     console.print(Markdown(help_text))
                     continue
@@ -53,8 +165,7 @@ async def main():
                     console.print(f"[red]未知命令: {command}[/red]")
                     continue
 
-            response = await ml.chat(user_input)
-            console.print(Markdown(response))
+            await run_turn(user_input)
 
 if __name__ == "__main__":
     try:
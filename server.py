@@ -0,0 +1,196 @@
+from rich.console import Console
+console = Console()
+console.print("[green]正在加载工具，请稍候...[/green]")
+
+from core.agents.MuLi import MuLi
+from core.tools.mcp_tools.mcp_tools import mcp_client, mcp_cache
+from core.utils.http import read_request, write_response, start_sse, write_sse
+from config_manage.manager import ConfigManager
+from llms.scheduler import scheduler
+from llms.response_cache import shared_cache
+from core.utils.tracing import metrics
+from core.utils.timers import timers
+from core.utils.notifications import notifications
+import asyncio
+import os
+import re
+import sys
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+CHAT_PATH_RE = re.compile(r"^/sessions/([^/]+)/chat$")
+SESSION_PATH_RE = re.compile(r"^/sessions/([^/]+)$")
+
+class SessionManager:
+    """Hosts many independent MuLi sessions in one event loop.
+
+    Every session gets its own history directory and shell state; the tool registry
+    and the MCP client are module-level and therefore shared by all sessions.
+    """
+
+    def __init__(self, history_root: str, max_sessions: int, wake_on_notification: bool = True):
+        self.history_root = history_root
+        self.max_sessions = max_sessions
+        self.wake_on_notification = wake_on_notification
+        self.sessions: dict[str, MuLi] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+        self.watchers: dict[str, asyncio.Task] = {}
+
+    def get(self, session_id: str) -> MuLi:
+        if session_id not in self.sessions:
+            if len(self.sessions) >= self.max_sessions:
+                raise OverflowError("too many sessions")
+            self.sessions[session_id] = MuLi(
+                console=Console(quiet=True),
+                history_dir=os.path.join(self.history_root, session_id),
+                session_id=session_id,
+                replay=False
+            )
+            self.locks[session_id] = asyncio.Lock()
+            if self.wake_on_notification:
+                self.watchers[session_id] = asyncio.create_task(self._watch(session_id))
+        return self.sessions[session_id]
+
+    async def _watch(self, session_id: str):
+        """Like the REPL, runs a turn when a finished job or timer notifies a session no client is talking to."""
+        while True:
+            await notifications.wait(session_id)
+            async with self.locks[session_id]:
+                # A client turn that ran meanwhile has already delivered the notifications
+                if notifications.has_pending(session_id):
+                    try:
+                        await self.sessions[session_id].chat("")
+                    except Exception as e:
+                        console.print(f"[red]会话 {session_id} 处理通知失败: {e}[/red]")
+
+    def close(self, session_id: str) -> bool:
+        """Closes an idle session; raises RuntimeError while one of its turns is running."""
+        if session_id in self.locks and self.locks[session_id].locked():
+            raise RuntimeError("session is busy")
+        self.locks.pop(session_id, None)
+        if (watcher := self.watchers.pop(session_id, None)) is not None:
+            watcher.cancel()
+        if self.sessions.pop(session_id, None) is None:
+            return False
+        notifications.drain(session_id)
+        # Tool modules are imported lazily; a session that never used the shell has nothing to release
+        shell = sys.modules.get("core.tools.py_tools.shell_for_ai")
+        if shell is not None:
+            shell._close_session(session_id)
+        return True
+
+    def describe(self) -> list[dict]:
+        return [
+            {"id": sid, "busy": self.locks[sid].locked(), "messages": len(ml.ai.messages)}
+            for sid, ml in self.sessions.items()
+        ]
+
+async def stream_chat(manager: SessionManager, session_id: str, message: str, writer: asyncio.StreamWriter):
+    """Runs one turn and streams its events to the client as Server-Sent Events."""
+    ml = manager.get(session_id)
+    queue: asyncio.Queue = asyncio.Queue()
+    await start_sse(writer)
+
+    # Turns of the same session are serialized; different sessions run concurrently
+    async with manager.locks[session_id]:
+        turn = asyncio.create_task(ml.chat(message, event_handler=lambda event, data: queue.put_nowait((event, data))))
+        getter = None
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, turn}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    event, data = getter.result()
+                    await write_sse(writer, event, data)
+                    continue
+                break
+            while not queue.empty():
+                event, data = queue.get_nowait()
+                await write_sse(writer, event, data)
+            try:
+                await write_sse(writer, "done", {"session": session_id, "response": turn.result()})
+            except Exception as e:
+                await write_sse(writer, "error", {"session": session_id, "error": str(e)})
+        finally:
+            if getter is not None:
+                getter.cancel()
+            # A client that disconnected mid-turn must not leave the turn running once the lock is released
+            turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
+
+async def handle_connection(manager: SessionManager, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                await write_response(writer, 400, {"error": "bad request"})
+                break
+            if request is None:
+                break
+
+            if request.path == "/health":
+                await write_response(writer, 200, {"status": "ok", "sessions": len(manager.sessions)})
+            elif request.path == "/metrics" and request.method == "GET":
+                await write_response(writer, 200, metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+            elif request.path == "/stats" and request.method == "GET":
+                llm_cache = shared_cache()
+                await write_response(writer, 200, {
+                    "scheduler": scheduler.stats(),
+                    "mcp": mcp_client.stats(),
+                    "mcp_cache": mcp_cache.stats() if mcp_cache else None,
+                    "llm_cache": llm_cache.stats() if llm_cache else None
+                })
+            elif request.path == "/sessions" and request.method == "GET":
+                await write_response(writer, 200, manager.describe())
+            elif (match := CHAT_PATH_RE.match(request.path)) and request.method == "POST":
+                session_id = match.group(1)
+                try:
+                    message = request.json().get("message")
+                except ValueError:
+                    message = None
+                if not SESSION_ID_RE.match(session_id) or not isinstance(message, str) or not message:
+                    await write_response(writer, 400, {"error": "expected a valid session id and JSON body {\"message\": \"...\"}"})
+                    continue
+                try:
+                    await stream_chat(manager, session_id, message, writer)
+                except OverflowError as e:
+                    await write_response(writer, 503, {"error": str(e)})
+                    continue
+                break # SSE responses close the connection
+            elif (match := SESSION_PATH_RE.match(request.path)) and request.method == "DELETE":
+                try:
+                    closed = manager.close(match.group(1))
+                except RuntimeError as e:
+                    await write_response(writer, 409, {"error": str(e)})
+                    continue
+                await write_response(writer, 200 if closed else 404, {"closed": closed})
+            else:
+                await write_response(writer, 404, {"error": "not found"})
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def main():
+    config = ConfigManager("config.json")
+    host = config.get("server.host", "127.0.0.1")
+    port = config.get("server.port", 8765)
+    manager = SessionManager(
+        history_root=config.get("server.history_root", os.path.join("history", "sessions")),
+        max_sessions=config.get("server.max_sessions", 64),
+        wake_on_notification=config.get("server.wake_on_notification", True)
+    )
+
+    # One persistent MCP connection is shared by every session; timers of every
+    # session fire into their notification inbox, which wakes the session
+    async with mcp_client, timers.running():
+        server = await asyncio.start_server(lambda r, w: handle_connection(manager, r, w), host, port)
+        console.print(f"[green]加载完成！服务已启动: http://{host}:{port}[/green]")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass